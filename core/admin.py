@@ -4,29 +4,40 @@ Updated for all models and fields.
 """
 
 from django.contrib import admin
-from .models import Citizen, Service, Transaction, Relationship, UserProfile, ServiceApplication, AuditLog
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path
+from .routers import replica_reads
+from .models import Citizen, Service, Transaction, Relationship, UserProfile, ServiceApplication, AuditLog, AssistanceLedger, OutboundMessage, RequestProfile
+
+class ReplicaChangelistMixin:
+    """Serve changelist pages (GET only) from the read replica."""
+
+    def changelist_view(self, request, extra_context=None):
+        return replica_reads(super().changelist_view)(request, extra_context)
 
 @admin.register(Citizen)
-class CitizenAdmin(admin.ModelAdmin):
+class CitizenAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
     list_display = ('last_name', 'first_name', 'barangay', 'precinct', 'status')
     search_fields = ('last_name', 'first_name', 'tin', 'philhealth_no')
     list_filter = ('barangay', 'status', 'sex', 'civil_status')
     list_per_page = 20
 
 @admin.register(Service)
-class ServiceAdmin(admin.ModelAdmin):
+class ServiceAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
     list_display = ('name', 'description', 'assistance_type', 'recipient_name', 'status')
     search_fields = ('name', 'recipient_name', 'assistance_type')
     list_filter = ('assistance_type', 'status')
 
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
+class TransactionAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
     list_display = ('citizen', 'service', 'date', 'amount')
     search_fields = ('citizen__last_name', 'citizen__first_name', 'service__name')
     list_filter = ('date',)
 
 @admin.register(Relationship)
-class RelationshipAdmin(admin.ModelAdmin):
+class RelationshipAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
     # Adjusted field names to match model
     list_display = ('from_citizen', 'to_citizen', 'relationship_type')
     search_fields = ('from_citizen__last_name', 'to_citizen__last_name')
@@ -39,13 +50,56 @@ class UserProfileAdmin(admin.ModelAdmin):
     list_filter = ('role', 'barangay')
 
 @admin.register(ServiceApplication)
-class ServiceApplicationAdmin(admin.ModelAdmin):
+class ServiceApplicationAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
     list_display = ('citizen', 'service', 'status', 'date_applied')
     search_fields = ('citizen__last_name', 'citizen__first_name', 'service__name')
     list_filter = ('status', 'date_applied')
 
 @admin.register(AuditLog)
-class AuditLogAdmin(admin.ModelAdmin):
+class AuditLogAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
     list_display = ('user', 'action', 'model_name', 'object_id', 'timestamp')
     search_fields = ('user__username', 'model_name', 'details')
     list_filter = ('action', 'timestamp')
+
+@admin.register(AssistanceLedger)
+class AssistanceLedgerAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
+    list_display = ('citizen', 'assistance_type', 'year', 'approved_amount', 'approved_count', 'disbursed_amount', 'transaction_count')
+    search_fields = ('citizen__last_name', 'citizen__first_name')
+    list_filter = ('assistance_type', 'year')
+    raw_id_fields = ('citizen',)
+
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at')
+    search_fields = ('recipient', 'message', 'dedupe_key')
+    list_filter = ('status', 'created_at')
+    raw_id_fields = ('citizen',)
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'status_code', 'duration_ms', 'query_count', 'query_time_ms', 'trigger', 'user')
+    search_fields = ('path', 'user__username')
+    list_filter = ('trigger', 'method', 'created_at')
+    exclude = ('top_functions', 'queries', 'collapsed_stacks')
+    readonly_fields = ('path', 'method', 'user', 'trigger', 'status_code', 'duration_ms', 'query_count', 'query_time_ms', 'created_at')
+    change_form_template = 'admin/core/requestprofile/change_form.html'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:profile_id>/collapsed/', self.admin_site.admin_view(self.collapsed_stacks), name='core_requestprofile_collapsed'),
+        ] + super().get_urls()
+
+    def collapsed_stacks(self, request, profile_id):
+        """Download sampled stacks in collapsed format for flamegraph.pl or speedscope."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        profile = get_object_or_404(RequestProfile, id=profile_id)
+        response = HttpResponse(profile.collapsed_stacks, content_type='text/plain')
+        response['Content-Disposition'] = f'attachment; filename=profile-{profile.id}.folded'
+        return response
@@ -0,0 +1,209 @@
+"""
+Per-precinct voter lists and claim slips for Lezo LGU System.
+Documents are rendered to print-ready HTML in a process pool and cached under
+DOCUMENTS_ROOT, keyed by barangay, precinct and a hash of the precinct's
+citizen data, so only precincts whose citizens changed are regenerated.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import groupby
+import fcntl
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import time
+
+import django
+from django.conf import settings
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.text import slugify
+from .models import Citizen
+
+logger = logging.getLogger('core')
+
+# Bump when the print templates or file names change so every precinct is regenerated.
+DOCUMENT_FORMAT = 2
+
+DOCUMENT_KINDS = {
+    'voter_list': 'core/print/voter_list.html',
+    'claim_slips': 'core/print/claim_slips.html',
+}
+
+FIELDS = ['id', 'no', 'last_name', 'first_name', 'middle_name', 'suffix', 'address',
+          'precinct', 'legend', 'sex', 'birthday', 'barangay']
+
+class GenerationInProgress(Exception):
+    pass
+
+def documents_root():
+    return getattr(settings, 'DOCUMENTS_ROOT', settings.BASE_DIR / 'documents')
+
+def precinct_key(barangay, precinct):
+    return f"{barangay}|{precinct or ''}"
+
+def _lock_path():
+    return os.path.join(str(documents_root()), '.lock')
+
+@contextmanager
+def generation_lock():
+    """
+    Hold an exclusive flock on DOCUMENTS_ROOT/.lock, raising GenerationInProgress
+    if another run has it. The OS releases the lock when the holding process
+    exits, so a killed run never leaves it stuck. The holder's pid is written
+    to the file for generation_running().
+    """
+    os.makedirs(str(documents_root()), exist_ok=True)
+    with open(_lock_path(), 'a+') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise GenerationInProgress('Document generation already running')
+        try:
+            lock.truncate(0)
+            lock.write(str(os.getpid()))
+            lock.flush()
+            yield
+        finally:
+            lock.truncate(0)
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def generation_running():
+    """
+    True while a process recorded in the lock file is alive. Reads the pid
+    instead of taking the lock, so checking never makes a real run fail.
+    """
+    try:
+        with open(_lock_path()) as lock:
+            pid = int(lock.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return False
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        # The holder was killed before it could clear its pid.
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def load_manifest():
+    try:
+        with open(os.path.join(documents_root(), 'manifest.json')) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def _write_atomic(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+def precincts(barangay=None):
+    """
+    Group citizens by (barangay, precinct) in a single ordered query.
+    A missing precinct (NULL or '') groups as ''. Returns
+    {key: (barangay, precinct, rows, version)} where version hashes the
+    printed fields, so any insert, edit or delete in a precinct changes it.
+    """
+    citizens = Citizen.objects.for_barangay(barangay).annotate(
+        precinct_group=Coalesce('precinct', Value(''))
+    ).order_by('barangay', 'precinct_group', 'last_name', 'first_name', 'id').values(*FIELDS)
+    groups = {}
+    for (brgy, precinct), rows in groupby(citizens.iterator(), key=lambda row: (row['barangay'], row['precinct'] or '')):
+        rows = list(rows)
+        digest = hashlib.sha1(repr((DOCUMENT_FORMAT, [tuple(row.values()) for row in rows])).encode())
+        groups[precinct_key(brgy, precinct)] = (brgy, precinct, rows, digest.hexdigest())
+    return groups
+
+def render_precinct(root, barangay, precinct, rows, version):
+    """Render every document kind for one precinct; returns its manifest entry."""
+    context = {
+        'barangay': barangay,
+        'precinct': precinct or 'Unassigned',
+        'citizens': rows,
+        'generated_at': timezone.now(),
+    }
+    directory = slugify(barangay) or 'unknown'
+    # slugify maps e.g. 0001A and 0001-A to the same name; the hash keeps files apart.
+    suffix = hashlib.sha1(precinct.encode()).hexdigest()[:8]
+    name = f"{slugify(precinct) or 'unassigned'}-{suffix}"
+    files = {}
+    for kind, template in DOCUMENT_KINDS.items():
+        relative = os.path.join(directory, f"{name}-{kind}.html")
+        _write_atomic(os.path.join(root, relative), render_to_string(template, context))
+        files[kind] = relative
+    return {
+        'barangay': barangay,
+        'precinct': precinct,
+        'version': version,
+        'count': len(rows),
+        'files': files,
+        'generated_at': context['generated_at'].isoformat(),
+    }
+
+def _remove_files(root, relatives):
+    for relative in relatives:
+        try:
+            os.remove(os.path.join(root, relative))
+        except FileNotFoundError:
+            pass
+
+def _render_precinct_args(args):
+    return render_precinct(*args)
+
+def generate(workers=1, force=False, barangay=None):
+    """
+    Regenerate documents for precincts whose data version changed.
+    Returns counts of rendered, unchanged and removed precincts and elapsed seconds.
+    Raises GenerationInProgress if another run holds the lock.
+    """
+    root = str(documents_root())
+    with generation_lock():
+        started = time.monotonic()
+        manifest = load_manifest()
+        current = precincts(barangay)
+        stale = [
+            key for key, entry in manifest.items()
+            if key not in current and (barangay is None or entry['barangay'] == barangay)
+        ]
+        for key in stale:
+            _remove_files(root, manifest.pop(key)['files'].values())
+        tasks = [
+            (root, brgy, precinct, rows, version)
+            for key, (brgy, precinct, rows, version) in current.items()
+            if force or manifest.get(key, {}).get('version') != version
+        ]
+        if workers > 1 and len(tasks) > 1:
+            # Spawn rather than fork so workers never inherit this process's DB connections.
+            # django.setup is the initializer itself: unpickling anything from this
+            # module would import the models before apps are loaded.
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=django.setup) as pool:
+                entries = list(pool.map(_render_precinct_args, tasks, chunksize=4))
+        else:
+            entries = [render_precinct(*task) for task in tasks]
+        for entry in entries:
+            key = precinct_key(entry['barangay'], entry['precinct'])
+            previous = manifest.get(key, {}).get('files', {}).values()
+            _remove_files(root, set(previous) - set(entry['files'].values()))
+            manifest[key] = entry
+        _write_atomic(os.path.join(root, 'manifest.json'), json.dumps(manifest, indent=1, sort_keys=True))
+        stats = {
+            'rendered': len(entries),
+            'unchanged': len(current) - len(entries),
+            'removed': len(stale),
+            'elapsed': time.monotonic() - started,
+        }
+        logger.info(f"Generated documents for {stats['rendered']} precincts in {stats['elapsed']:.2f}s "
+                    f"({stats['unchanged']} unchanged, {stats['removed']} removed)")
+        return stats
@@ -0,0 +1,21 @@
+"""
+Spreadsheet exports for Lezo LGU System.
+Builds the citizens list workbook downloaded from the Citizens page.
+"""
+
+import openpyxl
+
+CITIZEN_COLUMNS = ['NO', 'Last Name', 'First Name', 'Middle Name', 'Suffix', 'Address', 'Precinct', 'Sex', 'Birthday', 'Barangay']
+
+def citizens_workbook(citizens):
+    """Build the citizens export workbook from a Citizen queryset."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Citizens"
+    ws.append(CITIZEN_COLUMNS)
+    for citizen in citizens:
+        ws.append([
+            citizen.no, citizen.last_name, citizen.first_name, citizen.middle_name, citizen.suffix,
+            citizen.address, citizen.precinct, citizen.sex, citizen.birthday, citizen.barangay
+        ])
+    return wb
@@ -0,0 +1,16 @@
+"""
+Host metrics for the system health page: CPU load and memory usage of the
+machine running Lezo LGU System.
+"""
+
+import psutil
+
+def system_metrics():
+    """CPU and memory usage, with memory in MB."""
+    memory = psutil.virtual_memory()
+    return {
+        'cpu_usage': psutil.cpu_percent(interval=1),
+        'memory_total': memory.total / (1024 * 1024),
+        'memory_used': memory.used / (1024 * 1024),
+        'memory_percent': memory.percent,
+    }
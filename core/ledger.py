@@ -0,0 +1,124 @@
+"""
+Per-citizen assistance ledger for Lezo LGU System.
+Keeps running totals per citizen, assistance type and year so eligibility
+checks never need to aggregate Service or Transaction rows.
+"""
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import ExtractYear
+from django.utils import timezone
+from .models import AssistanceLedger, Service, Transaction
+import logging
+
+logger = logging.getLogger('core')
+
+def get_limit(assistance_type):
+    """Annual limit for an assistance type, or None if it is not capped."""
+    limit = getattr(settings, 'ASSISTANCE_ANNUAL_LIMITS', {}).get(assistance_type)
+    return Decimal(str(limit)) if limit is not None else None
+
+def ledger_year(moment):
+    """
+    Ledger year of a timestamp in TIME_ZONE, matching ExtractYear in reconcile().
+    None (an unsaved row) means now.
+    """
+    return timezone.localtime(moment).year
+
+def _apply(citizen_id, assistance_type, year, create=True, **deltas):
+    """
+    Add deltas to a ledger row with F() expressions, creating the row if needed.
+    Keys are field names (approved_amount, approved_count, ...). Debits pass
+    create=False so a cascading citizen delete never recreates its rows. A
+    debit larger than the row holds means the row never counted what is being
+    removed (e.g. services approved before reconcile_ledger first ran), so the
+    row is rebuilt from Service and Transaction instead.
+    """
+    updates = {field: F(field) + value for field, value in deltas.items()}
+    lookup = {'citizen_id': citizen_id, 'assistance_type': assistance_type, 'year': year}
+    with transaction.atomic():
+        if not create:
+            covered = {f"{field}__gte": -value for field, value in deltas.items()}
+            if AssistanceLedger.objects.filter(**lookup, **covered).update(**updates):
+                return
+            if AssistanceLedger.objects.filter(**lookup).exists():
+                logger.warning(f"Ledger row {citizen_id}/{assistance_type}/{year} is behind; rebuilding it")
+                reconcile(year, citizen_id=citizen_id, assistance_type=assistance_type)
+            return
+        if AssistanceLedger.objects.filter(**lookup).update(**updates):
+            return
+        try:
+            with transaction.atomic():
+                AssistanceLedger.objects.create(**lookup, **deltas)
+        except IntegrityError:
+            # Another writer created the row first; fall back to the update.
+            AssistanceLedger.objects.filter(**lookup).update(**updates)
+
+def record_service(service, sign=1):
+    """Credit (sign=1) or debit (sign=-1) an approved service."""
+    _apply(service.citizen_id, service.assistance_type, ledger_year(service.created_at), create=sign > 0,
+           approved_amount=sign * Decimal(str(service.amount)), approved_count=sign)
+
+def record_transaction(txn, sign=1):
+    """Credit (sign=1) or debit (sign=-1) a disbursement transaction."""
+    _apply(txn.citizen_id, txn.service.assistance_type, ledger_year(txn.date), create=sign > 0,
+           disbursed_amount=sign * Decimal(str(txn.amount)), transaction_count=sign)
+
+def eligibility(entry, assistance_type, amount=None):
+    """
+    Summarize a ledger entry (or None) against the annual limit.
+    Returns a dict with total, limit, remaining and whether `amount` still fits.
+    """
+    total = entry.approved_amount if entry else Decimal('0')
+    limit = get_limit(assistance_type)
+    remaining = limit - total if limit is not None else None
+    eligible = remaining is None or (amount or 0) <= remaining
+    return {'total': total, 'limit': limit, 'remaining': remaining, 'eligible': eligible}
+
+def ledger_map(citizen_ids, years):
+    """Fetch ledger rows keyed by (citizen_id, assistance_type, year) in one query."""
+    entries = AssistanceLedger.objects.filter(citizen_id__in=set(citizen_ids), year__in=set(years))
+    return {(e.citizen_id, e.assistance_type, e.year): e for e in entries}
+
+def reconcile(year=None, citizen_id=None, assistance_type=None):
+    """
+    Rebuild ledger rows from Service and Transaction in bulk, optionally
+    limited to a year, citizen and/or assistance type.
+    Returns the number of ledger rows written.
+    """
+    services = Service.objects.filter(status='Approved').annotate(year=ExtractYear('created_at'))
+    txns = Transaction.objects.annotate(year=ExtractYear('date'))
+    existing = AssistanceLedger.objects.all()
+    if year is not None:
+        services = services.filter(year=year)
+        txns = txns.filter(year=year)
+        existing = existing.filter(year=year)
+    if citizen_id is not None:
+        services = services.filter(citizen_id=citizen_id)
+        txns = txns.filter(citizen_id=citizen_id)
+        existing = existing.filter(citizen_id=citizen_id)
+    if assistance_type is not None:
+        services = services.filter(assistance_type=assistance_type)
+        txns = txns.filter(service__assistance_type=assistance_type)
+        existing = existing.filter(assistance_type=assistance_type)
+
+    rows = {}
+    for row in services.values('citizen_id', 'assistance_type', 'year').annotate(total=Sum('amount'), count=Count('id')):
+        entry = rows.setdefault((row['citizen_id'], row['assistance_type'], row['year']), {})
+        entry['approved_amount'] = row['total']
+        entry['approved_count'] = row['count']
+    for row in txns.values('citizen_id', 'service__assistance_type', 'year').annotate(total=Sum('amount'), count=Count('id')):
+        entry = rows.setdefault((row['citizen_id'], row['service__assistance_type'], row['year']), {})
+        entry['disbursed_amount'] = row['total']
+        entry['transaction_count'] = row['count']
+
+    with transaction.atomic():
+        existing.delete()
+        AssistanceLedger.objects.bulk_create([
+            AssistanceLedger(citizen_id=citizen_id, assistance_type=assistance_type, year=year, **totals)
+            for (citizen_id, assistance_type, year), totals in rows.items()
+        ], batch_size=1000)
+    logger.info(f"Reconciled {len(rows)} ledger rows")
+    return len(rows)
@@ -0,0 +1,54 @@
+"""
+Management command comparing serial and parallel sheet parsing for import_voters.
+Generates a 12-sheet voters workbook and times parse_workbook at each worker count.
+"""
+
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+import pandas as pd
+from django.core.management.base import BaseCommand
+from core.voter_import import BARANGAY_SHEETS, parse_workbook
+
+class Command(BaseCommand):
+    help = 'Times voter sheet parsing on a generated 12-sheet file with different worker counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Rows per barangay sheet')
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1], help='Worker counts to compare')
+        parser.add_argument('--keep', type=str, help='Save the generated workbook to this path')
+
+    def handle(self, *args, **options):
+        path = options['keep'] or os.path.join(tempfile.mkdtemp(), 'voters.xlsx')
+        started = time.monotonic()
+        self.generate(path, options['rows'])
+        self.stdout.write(f"Generated {path} ({12 * options['rows']} rows) in {time.monotonic() - started:.2f}s")
+
+        baseline = None
+        for workers in options['workers']:
+            started = time.monotonic()
+            rows = sum(len(sheet_rows) for _, sheet_rows, _ in parse_workbook(path, BARANGAY_SHEETS, workers=workers))
+            elapsed = time.monotonic() - started
+            baseline = baseline or elapsed
+            self.stdout.write(self.style.SUCCESS(
+                f"workers={workers}: parsed {rows} rows in {elapsed:.2f}s ({baseline / elapsed:.2f}x)"
+            ))
+        if not options['keep']:
+            os.remove(path)
+
+    def generate(self, path, rows):
+        rng = random.Random(0)
+        with pd.ExcelWriter(path, engine='openpyxl') as writer:
+            for sheet_name in BARANGAY_SHEETS:
+                pd.DataFrame({
+                    'LAST NAME': [f"Last{rng.randrange(10000)}" for _ in range(rows)],
+                    'FIRST NAME': [f"First{i}" for i in range(rows)],
+                    'MIDDLE NAME': [f"Middle{rng.randrange(100)}" for _ in range(rows)],
+                    'ADDRESS': [f"Purok {rng.randrange(1, 8)}, {sheet_name}" for _ in range(rows)],
+                    'PRECINCT': [f"{rng.randrange(1, 60):04d}A" for _ in range(rows)],
+                    'SEX': [rng.choice(['M', 'F']) for _ in range(rows)],
+                    'BIRTHDAY': [date(1950, 1, 1) + timedelta(days=rng.randrange(20000)) for _ in range(rows)],
+                    'CIVIL STATUS': [rng.choice(['Single', 'Married', 'Widowed']) for _ in range(rows)],
+                }).to_excel(writer, sheet_name=sheet_name, index=False)
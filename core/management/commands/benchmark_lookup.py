@@ -0,0 +1,102 @@
+"""
+Management command load-testing the citizen type-ahead endpoint.
+Run it against the same code served by sync gunicorn (WSGI) and by the Uvicorn
+worker (ASGI) to compare throughput and latency at high client concurrency.
+"""
+
+import asyncio
+import time
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+
+QUERIES = ['de', 'sa', 're', 'cr', 'ma', 'ju', 'an', 'ga', 'to', 'vi']
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))] if values else 0.0
+
+async def _get(host, port, path, cookie, timeout):
+    """Minimal HTTP/1.1 GET; returns the status code."""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write((
+            f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nCookie: {cookie}\r\n"
+            f"Accept: application/json\r\nConnection: close\r\n\r\n"
+        ).encode())
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        await asyncio.wait_for(reader.read(), timeout)
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+async def run_load(url, cookie, clients, requests, timeout):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    base = f"{parts.path or '/'}?{parts.query + '&' if parts.query else ''}q="
+    latencies, errors = [], 0
+    counter = iter(range(requests))
+
+    async def client():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                status = await _get(host, port, base + QUERIES[i % len(QUERIES)], cookie, timeout)
+            except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+                status = None
+            if status == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return latencies, errors, time.perf_counter() - started
+
+class Command(BaseCommand):
+    help = 'Load-tests citizen_lookup at high concurrency; pass one --url per server to compare sync and async'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', action='append', required=True,
+                            help='Lookup URL, e.g. http://127.0.0.1:8000/citizens/lookup/ (repeatable)')
+        parser.add_argument('--clients', type=int, default=200, help='Concurrent clients')
+        parser.add_argument('--requests', type=int, default=2000, help='Total requests per URL')
+        parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+        parser.add_argument('--username', type=str, help='User to authenticate as (default: first superuser)')
+
+    def handle(self, *args, **options):
+        session = self.login_session(options['username'])
+        cookie = f"{settings.SESSION_COOKIE_NAME}={session.session_key}"
+        try:
+            for url in options['url']:
+                latencies, errors, elapsed = asyncio.run(
+                    run_load(url, cookie, options['clients'], options['requests'], options['timeout'])
+                )
+                self.stdout.write(self.style.SUCCESS(
+                    f"{url}: {len(latencies)} ok, {errors} failed in {elapsed:.2f}s "
+                    f"({len(latencies) / elapsed:.0f} req/s) at {options['clients']} clients; "
+                    f"p50 {_percentile(latencies, 0.5) * 1000:.0f}ms, "
+                    f"p95 {_percentile(latencies, 0.95) * 1000:.0f}ms, "
+                    f"p99 {_percentile(latencies, 0.99) * 1000:.0f}ms"
+                ))
+        finally:
+            # Don't leave a live superuser session behind.
+            session.delete()
+
+    def login_session(self, username):
+        """Create a login session directly so the benchmark doesn't need a password."""
+        User = get_user_model()
+        users = User.objects.filter(username=username) if username else User.objects.filter(is_superuser=True)
+        user = users.first()
+        if user is None:
+            raise CommandError('No matching user to authenticate as')
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return session
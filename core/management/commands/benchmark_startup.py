@@ -0,0 +1,94 @@
+"""
+Management command measuring process startup cost: import time (-X importtime),
+wall time and RSS after django.setup() and URLconf loading, in a fresh interpreter.
+Fails when STARTUP_BUDGET is exceeded or a lazily loaded module is imported at startup.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in the child interpreter; loading the URLconf imports every view module.
+CHILD_SCRIPT = '''
+import json, os, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+elapsed = time.perf_counter() - started
+rss_kb = 0
+try:
+    with open('/proc/self/status') as status:
+        rss_kb = next(int(line.split()[1]) for line in status if line.startswith('VmRSS:'))
+except (OSError, StopIteration):
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    'setup_ms': elapsed * 1000,
+    'rss_mb': rss_kb / 1024,
+    'forbidden': [name for name in json.loads(os.environ['STARTUP_FORBIDDEN']) if name in sys.modules],
+}))
+'''
+
+def parse_importtime(stderr):
+    """Return (cumulative_us, module) for top-level imports in -X importtime output."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):
+            imports.append((int(cumulative), name.strip()))
+    return imports
+
+def measure_startup(forbidden=()):
+    """Start a fresh interpreter with -X importtime and return its startup measurements."""
+    env = dict(os.environ, STARTUP_FORBIDDEN=json.dumps(list(forbidden)))
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'lezo_lgu.settings')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode:
+        raise CommandError(f"Startup failed:\n{result.stderr[-2000:]}")
+    measurements = json.loads(result.stdout.strip().splitlines()[-1])
+    imports = parse_importtime(result.stderr)
+    measurements['import_ms'] = sum(us for us, _ in imports) / 1000
+    measurements['slowest'] = sorted(imports, reverse=True)
+    return measurements
+
+class Command(BaseCommand):
+    help = 'Reports import time and RSS after django.setup() and enforces STARTUP_BUDGET'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3, help='Fresh interpreters to start; the best run is reported')
+        parser.add_argument('--top', type=int, default=15, help='Slowest top-level imports to list')
+
+    def handle(self, *args, **options):
+        budget = getattr(settings, 'STARTUP_BUDGET', {})
+        forbidden = budget.get('forbidden_modules', [])
+        runs = [measure_startup(forbidden) for _ in range(max(1, options['runs']))]
+        best = min(runs, key=lambda run: run['setup_ms'])
+
+        self.stdout.write("Slowest top-level imports (cumulative):")
+        for us, name in best['slowest'][:options['top']]:
+            self.stdout.write(f"  {us / 1000:8.1f} ms  {name}")
+        self.stdout.write(
+            f"Import time {best['import_ms']:.1f} ms, setup {best['setup_ms']:.1f} ms, "
+            f"RSS {best['rss_mb']:.1f} MB (best of {len(runs)})"
+        )
+
+        failures = []
+        if best['forbidden']:
+            failures.append(f"lazy modules imported at startup: {', '.join(best['forbidden'])}")
+        if 'import_ms' in budget and best['import_ms'] > budget['import_ms']:
+            failures.append(f"import time {best['import_ms']:.1f} ms exceeds {budget['import_ms']} ms")
+        if 'rss_mb' in budget and best['rss_mb'] > budget['rss_mb']:
+            failures.append(f"RSS {best['rss_mb']:.1f} MB exceeds {budget['rss_mb']} MB")
+        if failures:
+            raise CommandError('Startup budget exceeded: ' + '; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Startup within budget'))
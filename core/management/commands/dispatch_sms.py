@@ -0,0 +1,39 @@
+"""
+Management command to deliver queued SMS notifications from the outbox.
+"""
+
+import time
+from django.core.management.base import BaseCommand
+from core.notifications import dispatch
+import logging
+
+logger = logging.getLogger('core')
+
+class Command(BaseCommand):
+    help = 'Sends pending SMS notifications in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Messages claimed per batch')
+        parser.add_argument('--concurrency', type=int, default=4, help='Concurrent gateway requests')
+        parser.add_argument('--rate', type=float, default=None, help='Maximum messages per second')
+        parser.add_argument('--max-attempts', type=int, default=5, help='Attempts before a message is marked Failed')
+        parser.add_argument('--backoff', type=int, default=30, help='Base retry delay in seconds')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to sleep when the outbox is empty')
+
+    def handle(self, *args, **options):
+        while True:
+            stats = dispatch(
+                batch_size=options['batch_size'], concurrency=options['concurrency'], rate=options['rate'],
+                max_attempts=options['max_attempts'], backoff=options['backoff']
+            )
+            if stats['claimed']:
+                summary = (f"Sent {stats['sent']}, retrying {stats['retried']}, failed {stats['failed']} "
+                           f"in {stats['elapsed']:.2f}s ({stats['throughput']:.1f} msg/s, "
+                           f"p50 {stats['latency_p50'] * 1000:.0f}ms, p95 {stats['latency_p95'] * 1000:.0f}ms)")
+                logger.info(summary)
+                self.stdout.write(self.style.SUCCESS(summary))
+            if not options['loop']:
+                break
+            if stats['claimed'] < options['batch_size']:
+                time.sleep(options['interval'])
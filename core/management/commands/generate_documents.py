@@ -0,0 +1,28 @@
+"""
+Management command to render per-precinct voter lists and claim slips.
+"""
+
+import os
+from django.core.management.base import BaseCommand, CommandError
+from core.documents import GenerationInProgress, generate
+import logging
+
+logger = logging.getLogger('core')
+
+class Command(BaseCommand):
+    help = 'Renders voter lists and claim slips for precincts whose citizens changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processes used to render precincts')
+        parser.add_argument('--barangay', type=str, help='Only generate precincts in this barangay')
+        parser.add_argument('--force', action='store_true', help='Regenerate every precinct even if unchanged')
+
+    def handle(self, *args, **options):
+        try:
+            stats = generate(workers=options['workers'], force=options['force'], barangay=options['barangay'])
+        except GenerationInProgress as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {stats['rendered']} precincts, {stats['unchanged']} unchanged, "
+            f"{stats['removed']} removed in {stats['elapsed']:.2f}s"
+        ))
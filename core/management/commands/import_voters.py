@@ -3,9 +3,11 @@ Management command to import voters from Excel file.
 Updated for expanded Citizen fields.
 """
 
+import time
 import pandas as pd
 from django.core.management.base import BaseCommand, CommandError
 from core.models import Citizen
+from core.voter_import import BARANGAY_SHEETS, parse_workbook
 import logging
 
 logger = logging.getLogger('core')
@@ -15,6 +17,7 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('excel_file', type=str, help='Path to the voters.xlsx file')
+        parser.add_argument('--workers', type=int, default=1, help='Processes used to parse sheets in parallel')
 
     def handle(self, *args, **options):
         excel_file = options['excel_file']
@@ -24,67 +27,46 @@ class Command(BaseCommand):
         
         try:
             logger.info(f"Starting import from {excel_file}")
+            started = time.monotonic()
             xls = pd.ExcelFile(excel_file)
-            expected_sheets = {'Agcawilan', 'Bagto', 'Bugasongan', 'Carugdog', 'Cogon', 
-                              'Ibao', 'Mina', 'Poblacion', 'Silakat Nonok', 'Sta. Cruz', 
-                              'Sta. Cruz Biga-a', 'Tayhawan'}
-            if set(xls.sheet_names) != expected_sheets:
+            if set(xls.sheet_names) != set(BARANGAY_SHEETS):
                 logger.error(f"Invalid sheet names in {excel_file}")
                 raise CommandError('Excel file must have 12 specific barangay sheets')
-            
-            for sheet_name in xls.sheet_names:
-                df = pd.read_excel(xls, sheet_name=sheet_name)
+
+            seen_with_birthday, seen_names = self.existing_keys()
+            for sheet_name, rows, errors in parse_workbook(excel_file, xls.sheet_names, workers=options['workers']):
                 barangay = sheet_name
+                for index, message in errors:
+                    logger.error(f"Error processing row {index} in {sheet_name}: {message}")
+                    self.stdout.write(self.style.ERROR(f"Error at row {index} in {sheet_name}: {message}"))
                 citizens_to_create = []
-                for index, row in df.iterrows():
-                    try:
-                        last_name = str(row['LAST NAME']).strip()
-                        first_name = str(row['FIRST NAME']).strip()
-                        middle_name = str(row['MIDDLE NAME']).strip() if 'MIDDLE NAME' in row and pd.notnull(row['MIDDLE NAME']) else None
-                        suffix = str(row['SUFFIX']).strip() if 'SUFFIX' in row and pd.notnull(row['SUFFIX']) else None
-                        address = str(row['ADDRESS']).strip() if 'ADDRESS' in row and pd.notnull(row['ADDRESS']) else None
-                        precinct = str(row['PRECINCT']).strip()
-                        legend = str(row['LEGEND']).strip() if 'LEGEND' in row and pd.notnull(row['LEGEND']) else None
-                        sex = str(row['SEX']).strip() if 'SEX' in row and pd.notnull(row['SEX']) and row['SEX'] in ['M', 'F'] else None
-                        birthday = pd.to_datetime(row.get('BIRTHDAY'), errors='coerce') if 'BIRTHDAY' in row and pd.notnull(row['BIRTHDAY']) else None
-                        place_of_birth = str(row['PLACE OF BIRTH']).strip() if 'PLACE OF BIRTH' in row and pd.notnull(row['PLACE OF BIRTH']) else None
-                        civil_status = str(row['CIVIL STATUS']).strip().lower() if 'CIVIL STATUS' in row and pd.notnull(row['CIVIL STATUS']) else None
-                        tin = str(row['TIN']).strip() if 'TIN' in row and pd.notnull(row['TIN']) else None
-                        philhealth_no = str(row['PHILHEALTH NO']).strip() if 'PHILHEALTH NO' in row and pd.notnull(row['PHILHEALTH NO']) else None
-                        status = str(row['STATUS']).strip().lower() if 'STATUS' in row and pd.notnull(row['STATUS']) else 'active'
-
-                        if birthday:
-                            exists = Citizen.objects.filter(last_name=last_name, first_name=first_name, birthday=birthday).exists()
-                        else:
-                            exists = Citizen.objects.filter(last_name=last_name, first_name=first_name).exists()
-
-                        if not exists:
-                            citizens_to_create.append(Citizen(
-                                last_name=last_name,
-                                first_name=first_name,
-                                middle_name=middle_name,
-                                suffix=suffix,
-                                address=address,
-                                precinct=precinct,
-                                legend=legend,
-                                sex=sex,
-                                birthday=birthday,
-                                place_of_birth=place_of_birth,
-                                civil_status=civil_status,
-                                tin=tin,
-                                philhealth_no=philhealth_no,
-                                status=status,
-                                barangay=barangay
-                            ))
-                    except Exception as e:
-                        logger.error(f"Error processing row {index} in {sheet_name}: {e}")
-                        self.stdout.write(self.style.ERROR(f"Error at row {index} in {sheet_name}: {e}"))
-                        continue
-                Citizen.objects.bulk_create(citizens_to_create)
+                for index, fields in rows:
+                    name = (fields['last_name'], fields['first_name'])
+                    if fields['birthday']:
+                        exists = name + (fields['birthday'],) in seen_with_birthday
+                    else:
+                        exists = name in seen_names
+                    if not exists:
+                        seen_with_birthday.add(name + (fields['birthday'],))
+                        seen_names.add(name)
+                        citizens_to_create.append(Citizen(barangay=barangay, **fields))
+                Citizen.objects.bulk_create(citizens_to_create, batch_size=1000)
                 logger.info(f"Imported {len(citizens_to_create)} citizens from {barangay}")
                 self.stdout.write(self.style.SUCCESS(f"Imported {len(citizens_to_create)} citizens from {barangay}"))
-            logger.info("Import completed successfully")
+            logger.info(f"Import completed successfully in {time.monotonic() - started:.2f}s")
             self.stdout.write(self.style.SUCCESS('Import completed successfully'))
         except Exception as e:
             logger.error(f"Error importing {excel_file}: {e}")
             raise CommandError(f"Error importing file: {e}")
+
+    def existing_keys(self):
+        """
+        Load name and name+birthday keys of existing citizens once, so duplicate
+        checks across all sheets happen in memory instead of a query per row.
+        """
+        seen_with_birthday, seen_names = set(), set()
+        for last_name, first_name, birthday in Citizen.objects.values_list('last_name', 'first_name', 'birthday').iterator():
+            seen_names.add((last_name, first_name))
+            if birthday:
+                seen_with_birthday.add((last_name, first_name, birthday))
+        return seen_with_birthday, seen_names
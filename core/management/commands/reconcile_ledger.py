@@ -0,0 +1,19 @@
+"""
+Management command to rebuild the assistance ledger from Service and Transaction.
+"""
+
+from django.core.management.base import BaseCommand
+from core import ledger
+import logging
+
+logger = logging.getLogger('core')
+
+class Command(BaseCommand):
+    help = 'Rebuilds per-citizen assistance ledger totals in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Only rebuild totals for this year')
+
+    def handle(self, *args, **options):
+        count = ledger.reconcile(year=options['year'])
+        self.stdout.write(self.style.SUCCESS(f"Reconciled {count} ledger rows"))
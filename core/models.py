@@ -1,6 +1,13 @@
 from django.db import models
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+class BarangayQuerySet(models.QuerySet):
+    """Queries scoped to one barangay, served by the barangay-leading indexes."""
+
+    def for_barangay(self, barangay):
+        return self.filter(barangay=barangay) if barangay else self
 
 class Citizen(models.Model):
     no = models.IntegerField(null=True, blank=True, unique=True)
@@ -17,17 +24,24 @@ class Citizen(models.Model):
     civil_status = models.CharField(max_length=50, blank=True, null=True)
     tin = models.CharField(max_length=50, blank=True, null=True, unique=True)
     philhealth_no = models.CharField(max_length=50, blank=True, null=True, unique=True)
+    mobile_no = models.CharField(max_length=20, blank=True, null=True)
     barangay = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
     # Added 'status' field to match CitizenAdmin.list_display
     status = models.CharField(max_length=20, choices=[('Active', 'Active'), ('Inactive', 'Inactive')], default='Active')
 
+    objects = BarangayQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.barangay})"
 
     class Meta:
         verbose_name = "Citizen"
         verbose_name_plural = "Citizens"
+        indexes = [
+            models.Index(fields=['barangay', 'last_name', 'first_name']),
+            models.Index(fields=['barangay', 'precinct']),
+        ]
 
 class Service(models.Model):
     ASSISTANCE_TYPES = (
@@ -54,12 +68,18 @@ class Service(models.Model):
     name = models.CharField(max_length=100, default='Assistance')  # Placeholder for display
     description = models.TextField(default='Service assistance')
 
+    objects = BarangayQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.assistance_type} for {self.recipient_name} ({self.barangay})"
 
     class Meta:
         verbose_name = "Service"
         verbose_name_plural = "Services"
+        indexes = [
+            models.Index(fields=['barangay', 'status']),
+            models.Index(fields=['barangay', 'assistance_type']),
+        ]
 
 class Relationship(models.Model):
     RELATIONSHIP_TYPES = (
@@ -158,3 +178,84 @@ class ServiceApplication(models.Model):
     class Meta:
         verbose_name = "Service Application"
         verbose_name_plural = "Service Applications"
+
+class AssistanceLedger(models.Model):
+    """
+    Running assistance totals per citizen, assistance type and year.
+    Maintained by core.ledger; rebuild with `manage.py reconcile_ledger`.
+    """
+    citizen = models.ForeignKey(Citizen, on_delete=models.CASCADE, related_name='assistance_ledger')
+    assistance_type = models.CharField(max_length=50, choices=Service.ASSISTANCE_TYPES)
+    year = models.PositiveSmallIntegerField()
+    approved_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    approved_count = models.PositiveIntegerField(default=0)
+    disbursed_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    transaction_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.citizen} - {self.assistance_type} {self.year}: {self.approved_amount}"
+
+    class Meta:
+        verbose_name = "Assistance Ledger"
+        verbose_name_plural = "Assistance Ledger"
+        unique_together = ('citizen', 'assistance_type', 'year')
+
+class OutboundMessage(models.Model):
+    """
+    SMS outbox row written in the same transaction as the change it reports.
+    Delivered by core.notifications.dispatch (`manage.py dispatch_sms`).
+    """
+    STATUS_CHOICES = (
+        ('Pending', 'Pending'),
+        ('Sending', 'Sending'),
+        ('Sent', 'Sent'),
+        ('Failed', 'Failed'),
+    )
+
+    citizen = models.ForeignKey(Citizen, on_delete=models.SET_NULL, null=True, blank=True, related_name='messages')
+    recipient = models.CharField(max_length=255)
+    message = models.TextField()
+    dedupe_key = models.CharField(max_length=255, unique=True, blank=True, null=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"SMS to {self.recipient} ({self.status})"
+
+    class Meta:
+        verbose_name = "Outbound Message"
+        verbose_name_plural = "Outbound Messages"
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+class RequestProfile(models.Model):
+    """Profile of one request captured by core.profiling.ProfilerMiddleware."""
+    TRIGGER_CHOICES = (
+        ('requested', 'Requested'),
+        ('sampled', 'Sampled'),
+    )
+
+    path = models.CharField(max_length=255)
+    method = models.CharField(max_length=10)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    trigger = models.CharField(max_length=20, choices=TRIGGER_CHOICES)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField(default=0)
+    query_time_ms = models.FloatField(default=0)
+    top_functions = models.JSONField(default=list)
+    queries = models.JSONField(default=list)
+    collapsed_stacks = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+    class Meta:
+        verbose_name = "Request Profile"
+        verbose_name_plural = "Request Profiles"
+        ordering = ['-created_at']
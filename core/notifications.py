@@ -0,0 +1,187 @@
+"""
+Outbound SMS notifications for Lezo LGU System.
+Messages are queued in the OutboundMessage outbox inside the caller's
+transaction and delivered later in batches by `manage.py dispatch_sms`.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import OutboundMessage
+
+logger = logging.getLogger('core')
+
+class SMSGateway:
+    """
+    Interface for SMS gateways. Subclasses implement send() and raise
+    GatewayError (or any exception) when delivery fails.
+    """
+
+    def send(self, recipient, message):
+        raise NotImplementedError
+
+class GatewayError(Exception):
+    pass
+
+class LogGateway(SMSGateway):
+    """Default gateway: writes messages to the log, as the old placeholder did."""
+
+    def send(self, recipient, message):
+        logger.info(f"SMS to {recipient}: {message}")
+
+class FakeGateway(SMSGateway):
+    """
+    In-memory gateway for tests and local benchmarks.
+    `latency` (seconds) is slept per send; `fail_times` makes the first N sends fail.
+    """
+
+    def __init__(self, latency=0, fail_times=0):
+        self.latency = latency
+        self.fail_times = fail_times
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send(self, recipient, message):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if self.fail_times > 0:
+                self.fail_times -= 1
+                raise GatewayError("Simulated gateway failure")
+            self.sent.append((recipient, message))
+
+def get_gateway():
+    """Instantiate the gateway named by settings.SMS_GATEWAY."""
+    return import_string(getattr(settings, 'SMS_GATEWAY', 'core.notifications.LogGateway'))()
+
+def recipient_for(citizen):
+    """The citizen's mobile number, or None if there is nothing to text."""
+    return (citizen.mobile_no or '').strip() or None
+
+def enqueue_sms(citizen, message, dedupe_key=None):
+    """
+    Queue an SMS in the outbox. Call inside the transaction that makes the
+    change being reported so the message is committed (or rolled back) with it.
+    A message whose dedupe_key is already queued is not queued again. Returns
+    None without queueing when the citizen has no mobile number.
+    """
+    recipient = recipient_for(citizen)
+    if recipient is None:
+        logger.info(f"Skipped SMS to citizen {citizen.id}: no mobile number")
+        return None
+    try:
+        with transaction.atomic():
+            return OutboundMessage.objects.create(
+                citizen=citizen, recipient=recipient, message=message, dedupe_key=dedupe_key
+            )
+    except IntegrityError:
+        logger.info(f"Skipped duplicate SMS {dedupe_key}")
+        return OutboundMessage.objects.get(dedupe_key=dedupe_key)
+
+class RateLimiter:
+    """Thread-safe limiter spacing calls at most `rate` per second (None for no limit)."""
+
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+def _claim(batch_size, lease):
+    """Mark up to batch_size due messages as Sending and return them."""
+    now = timezone.now()
+    due = Q(status='Pending') | Q(status='Sending')
+    with transaction.atomic():
+        batch = list(
+            OutboundMessage.objects.select_for_update(skip_locked=True)
+            .filter(due, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        # A Sending row whose lease expired belongs to a worker that died mid-batch.
+        OutboundMessage.objects.filter(id__in=[m.id for m in batch]).update(
+            status='Sending', next_attempt_at=now + lease
+        )
+    return batch
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+def dispatch(gateway=None, batch_size=100, concurrency=4, rate=None, max_attempts=5, backoff=30, lease=300):
+    """
+    Send one batch of due messages.
+    Sends run on `concurrency` threads, spaced to `rate` messages per second.
+    Failures are retried after backoff * 2**(attempts - 1) seconds until
+    max_attempts is reached, then marked Failed.
+    Returns throughput and latency metrics for the batch.
+    """
+    gateway = gateway or get_gateway()
+    limiter = RateLimiter(rate)
+    started = time.monotonic()
+    batch = _claim(batch_size, timedelta(seconds=lease))
+
+    def send(message):
+        limiter.wait()
+        t0 = time.monotonic()
+        try:
+            gateway.send(message.recipient, message.message)
+            return message, None, time.monotonic() - t0
+        except Exception as e:
+            return message, e, time.monotonic() - t0
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        results = list(pool.map(send, batch))
+
+    sent = retried = failed = 0
+    latencies = []
+    now = timezone.now()
+    for message, error, latency in results:
+        latencies.append(latency)
+        message.attempts += 1
+        if error is None:
+            message.status, message.sent_at, message.last_error = 'Sent', now, None
+            sent += 1
+        elif message.attempts >= max_attempts:
+            message.status, message.last_error = 'Failed', str(error)
+            failed += 1
+            logger.error(f"SMS {message.id} to {message.recipient} failed permanently: {error}")
+        else:
+            message.status, message.last_error = 'Pending', str(error)
+            message.next_attempt_at = now + timedelta(seconds=backoff * 2 ** (message.attempts - 1))
+            retried += 1
+            logger.warning(f"SMS {message.id} to {message.recipient} failed, retrying: {error}")
+    OutboundMessage.objects.bulk_update(
+        [message for message, _, _ in results],
+        ['status', 'attempts', 'sent_at', 'last_error', 'next_attempt_at']
+    )
+
+    elapsed = time.monotonic() - started
+    return {
+        'claimed': len(batch),
+        'sent': sent,
+        'retried': retried,
+        'failed': failed,
+        'elapsed': elapsed,
+        'throughput': len(batch) / elapsed if elapsed and batch else 0.0,
+        'latency_p50': _percentile(latencies, 0.5),
+        'latency_p95': _percentile(latencies, 0.95),
+    }
@@ -0,0 +1,212 @@
+"""
+On-demand request profiling for Lezo LGU System.
+Superusers add ?_profile=1 (or an X-Profile header) to a request, or
+PROFILER_SAMPLE_RATE profiles 1 in N requests. Each profiled request stores
+a cProfile top-functions table, sampled call stacks for flamegraphs and the
+SQL timeline in RequestProfile, browsable from the admin.
+"""
+
+from collections import Counter
+from contextlib import ExitStack
+import cProfile
+import logging
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from .models import RequestProfile
+
+logger = logging.getLogger('core')
+
+TOP_FUNCTIONS = 50
+
+class QueryRecorder:
+    """execute_wrapper hook recording each SQL statement with its start offset and duration."""
+
+    def __init__(self, alias, started):
+        self.alias = alias
+        self.started = started
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            end = time.perf_counter()
+            self.queries.append({
+                'alias': self.alias,
+                'sql': sql,
+                'start_ms': round((start - self.started) * 1000, 3),
+                'duration_ms': round((end - start) * 1000, 3),
+            })
+
+class StackSampler(threading.Thread):
+    """
+    Samples the call stack of one thread every `interval` seconds and counts
+    stacks in collapsed "outer;inner" form, as read by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def collapsed(self):
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+def top_functions(profiler, limit=TOP_FUNCTIONS):
+    """Summarize a cProfile run as rows sorted by cumulative time."""
+    stats = pstats.Stats(profiler).stats
+    rows = [
+        {
+            'function': f"{os.path.basename(filename)}:{line}({name})",
+            'calls': calls,
+            'primitive_calls': primitive_calls,
+            'tottime_ms': round(tottime * 1000, 3),
+            'cumtime_ms': round(cumtime * 1000, 3),
+        }
+        for (filename, line, name), (primitive_calls, calls, tottime, cumtime, _) in stats.items()
+    ]
+    rows.sort(key=lambda row: row['cumtime_ms'], reverse=True)
+    return rows[:limit]
+
+class ProfileSession:
+    """cProfile, stack sampler and SQL recorders running from creation until stop()."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.duration = None
+        self.recorders = [QueryRecorder(connection.alias, self.started) for connection in connections.all()]
+        self._wrappers = ExitStack()
+        for connection, recorder in zip(connections.all(), self.recorders):
+            self._wrappers.enter_context(connection.execute_wrapper(recorder))
+        self.sampler = StackSampler(threading.get_ident())
+        self.sampler.start()
+        self.profiler = cProfile.Profile()
+        try:
+            self.profiler.enable()
+        except ValueError:
+            # Another profiler is already active on this thread.
+            self.profiler = None
+
+    def stop(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.sampler.stop()
+        self._wrappers.close()
+        self.duration = time.perf_counter() - self.started
+
+class ProfilerMiddleware:
+    """
+    Profiles selected requests. Must come after AuthenticationMiddleware.
+    Requests that are not profiled only pay for a substring check on the
+    query string, a header lookup and, when sampling is on, one random().
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.param = getattr(settings, 'PROFILER_PARAM', '_profile')
+        self.header = 'HTTP_' + getattr(settings, 'PROFILER_HEADER', 'X-Profile').upper().replace('-', '_')
+        rate = getattr(settings, 'PROFILER_SAMPLE_RATE', 0)
+        self.sample_probability = 1.0 / rate if rate else 0
+        self.keep = getattr(settings, 'PROFILER_KEEP', 500)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def trigger_for(self, request):
+        """'sampled', 'requested' (still subject to the superuser check) or None."""
+        if self.sample_probability and random.random() < self.sample_probability:
+            return 'sampled'
+        if self.param in request.META.get('QUERY_STRING', '') or self.header in request.META:
+            if request.GET.get(self.param) or request.META.get(self.header):
+                return 'requested'
+        return None
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        trigger = self.trigger_for(request)
+        if trigger == 'requested' and not request.user.is_superuser:
+            trigger = None
+        if trigger is None:
+            return self.get_response(request)
+        return self.profile(request, trigger, self.get_response)
+
+    async def __acall__(self, request):
+        trigger = self.trigger_for(request)
+        if trigger == 'requested' and not (await request.auser()).is_superuser:
+            trigger = None
+        if trigger is None:
+            return await self.get_response(request)
+        # Sync views and async ORM calls run in the thread-sensitive executor
+        # with that thread's connections, so profile the request from there;
+        # async_to_sync routes their work back to this same thread.
+        return await sync_to_async(self.profile, thread_sensitive=True)(
+            request, trigger, async_to_sync(self.get_response)
+        )
+
+    def profile(self, request, trigger, get_response):
+        session = ProfileSession()
+        try:
+            response = get_response(request)
+        finally:
+            session.stop()
+        self.save(request, response, trigger, session)
+        return response
+
+    def save(self, request, response, trigger, session):
+        queries = sorted((q for r in session.recorders for q in r.queries), key=lambda q: q['start_ms'])
+        user = getattr(request, 'user', None)
+        try:
+            RequestProfile.objects.create(
+                path=request.path[:255],
+                method=request.method,
+                user=user if user is not None and user.is_authenticated else None,
+                trigger=trigger,
+                status_code=response.status_code,
+                duration_ms=round(session.duration * 1000, 3),
+                query_count=len(queries),
+                query_time_ms=round(sum(q['duration_ms'] for q in queries), 3),
+                top_functions=top_functions(session.profiler) if session.profiler is not None else [],
+                queries=queries,
+                collapsed_stacks=session.sampler.collapsed(),
+            )
+            self.prune()
+        except Exception as e:
+            logger.error(f"Could not store profile for {request.path}: {e}")
+
+    def prune(self):
+        """Delete all but the newest `keep` profiles (0 keeps everything)."""
+        if not self.keep:
+            return
+        oldest_kept = RequestProfile.objects.order_by('-id').values_list('id', flat=True)[self.keep - 1:self.keep]
+        if oldest_kept:
+            RequestProfile.objects.filter(id__lt=oldest_kept[0]).delete()
@@ -0,0 +1,173 @@
+"""
+Read-replica routing for Lezo LGU System.
+Views wrapped with replica_reads send their reads to the `replica` database
+alias. Everything else, all writes, and users who wrote within the last
+REPLICA_PIN_SECONDS stay on `default`. Reads also fall back to `default`
+while the replica is unreachable or lags by more than REPLICA_MAX_LAG_SECONDS.
+Only core models are read from the replica; sessions and users always come
+from `default`, so a session that hasn't replicated yet never logs a user out.
+"""
+
+from contextvars import ContextVar
+from functools import wraps
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('core')
+
+REPLICA = 'replica'
+REPLICA_APPS = {'core'}
+PIN_COOKIE = 'pin_primary'
+HEALTH_TTL = 5
+
+_use_replica = ContextVar('use_replica', default=False)
+_pinned = ContextVar('pinned_to_primary', default=False)
+_wrote = ContextVar('wrote_to_primary', default=False)
+
+_health = {'checked': 0.0, 'available': False}
+_health_lock = threading.Lock()
+
+def check_replica():
+    """Query the replica directly; returns True if it answers and is not lagging."""
+    if REPLICA not in connections.databases:
+        return False
+    max_lag = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 10)
+    try:
+        connection = connections[REPLICA]
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # 0 when everything received has been replayed, however long the
+                # primary has been idle; NULL on a primary standing in.
+                cursor.execute(
+                    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+                )
+            else:
+                cursor.execute("SELECT NULL")
+            lag = cursor.fetchone()[0]
+    except Exception as e:
+        logger.warning(f"Replica unavailable, reading from primary: {e}")
+        return False
+    if lag is not None and lag > max_lag:
+        logger.warning(f"Replica lagging {lag:.1f}s, reading from primary")
+        return False
+    return True
+
+def replica_available():
+    """Cached result of check_replica, refreshed at most every HEALTH_TTL seconds."""
+    now = time.monotonic()
+    with _health_lock:
+        if now - _health['checked'] < HEALTH_TTL:
+            return _health['available']
+        _health['checked'] = now
+    available = check_replica()
+    _health['available'] = available
+    return available
+
+def reset_replica_health():
+    _health['checked'] = 0.0
+
+def replica_reads(view_func):
+    """
+    Route a read-only view's GET/HEAD queries to the replica. Works on sync
+    and async views; async ORM calls inherit the scope. Lazy responses
+    (TemplateResponse) are rendered inside the scope so their querysets are
+    evaluated on the replica too.
+    """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await view_func(request, *args, **kwargs)
+            token = _use_replica.set(True)
+            try:
+                return await view_func(request, *args, **kwargs)
+            finally:
+                _use_replica.reset(token)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view_func(request, *args, **kwargs)
+        token = _use_replica.set(True)
+        try:
+            response = view_func(request, *args, **kwargs)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+            return response
+        finally:
+            _use_replica.reset(token)
+    return wrapper
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in REPLICA_APPS:
+            return 'default'
+        if _use_replica.get() and not _pinned.get() and replica_available():
+            return REPLICA
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+class PrimaryPinMiddleware:
+    """
+    Pins a browser's reads to the primary for REPLICA_PIN_SECONDS after any
+    request that wrote, so users see their own changes despite replica lag.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        tokens = self.start(request)
+        try:
+            return self.finish(self.get_response(request))
+        finally:
+            self.reset(tokens)
+
+    async def __acall__(self, request):
+        tokens = self.start(request)
+        try:
+            return self.finish(await self.get_response(request))
+        finally:
+            self.reset(tokens)
+
+    def start(self, request):
+        try:
+            pinned = float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            pinned = False
+        return _pinned.set(pinned), _wrote.set(False)
+
+    def finish(self, response):
+        if _wrote.get():
+            response.set_cookie(PIN_COOKIE, str(time.time() + self.pin_seconds), max_age=self.pin_seconds, httponly=True, samesite='Lax')
+        return response
+
+    def reset(self, tokens):
+        pinned_token, wrote_token = tokens
+        _pinned.reset(pinned_token)
+        _wrote.reset(wrote_token)
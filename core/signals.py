@@ -1,10 +1,11 @@
 """
-Signal handlers for audit logging.
+Signal handlers for audit logging and the assistance ledger.
 """
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from .models import Citizen, ServiceApplication, Transaction
+from .models import Citizen, Service, ServiceApplication, Transaction
+from . import ledger
 import logging
 
 logger = logging.getLogger('core')
@@ -18,10 +19,47 @@ def log_citizen_update(sender, instance, created, **kwargs):
 @receiver(post_save, sender=ServiceApplication)
 def log_application_update(sender, instance, created, **kwargs):
     action = 'created' if created else 'updated'
-    user = instance.approved_by.username if instance.approved_by else 'unknown'
+    approved_by = getattr(instance, 'approved_by', None)
+    user = approved_by.username if approved_by else 'unknown'
     logger.info(f"ServiceApplication {instance.id} {action} by {user}")
 
 @receiver(post_save, sender=Transaction)
 def log_transaction_update(sender, instance, created, **kwargs):
     if created:
         logger.info(f"Transaction {instance.id} created for {instance.citizen} by system")
+
+@receiver(pre_save, sender=Service)
+def remember_service_state(sender, instance, **kwargs):
+    instance._ledger_previous = None
+    if instance.pk:
+        instance._ledger_previous = Service.objects.filter(pk=instance.pk, status='Approved').first()
+
+@receiver(post_save, sender=Service)
+def update_ledger_for_service(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_ledger_previous', None)
+    if previous is not None:
+        ledger.record_service(previous, sign=-1)
+    if instance.status == 'Approved':
+        ledger.record_service(instance)
+
+@receiver(post_delete, sender=Service)
+def remove_service_from_ledger(sender, instance, **kwargs):
+    if instance.status == 'Approved':
+        ledger.record_service(instance, sign=-1)
+
+@receiver(pre_save, sender=Transaction)
+def remember_transaction_state(sender, instance, **kwargs):
+    instance._ledger_previous = None
+    if instance.pk:
+        instance._ledger_previous = Transaction.objects.select_related('service').filter(pk=instance.pk).first()
+
+@receiver(post_save, sender=Transaction)
+def update_ledger_for_transaction(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_ledger_previous', None)
+    if previous is not None:
+        ledger.record_transaction(previous, sign=-1)
+    ledger.record_transaction(instance)
+
+@receiver(post_delete, sender=Transaction)
+def remove_transaction_from_ledger(sender, instance, **kwargs):
+    ledger.record_transaction(instance, sign=-1)
@@ -0,0 +1,108 @@
+// Type-ahead citizen lookup for .citizen-autocomplete containers.
+// Keystrokes are debounced and any in-flight request is aborted when a newer
+// one starts, so only the latest query's results are shown. With a hidden
+// .citizen-autocomplete-value input the choice fills the form field;
+// without one (the citizens search box) it opens the citizen's page.
+(() => {
+    const DEBOUNCE_MS = 200;
+    const MIN_CHARS = 2;
+
+    const attach = container => {
+        const input = container.querySelector('.citizen-autocomplete-input');
+        const hidden = container.querySelector('.citizen-autocomplete-value');
+        const list = container.querySelector('.citizen-autocomplete-results');
+        const url = container.dataset.lookupUrl;
+        let timer = null;
+        let controller = null;
+
+        const clear = () => { list.replaceChildren(); };
+
+        const choose = item => {
+            if (!hidden) {
+                window.location.href = item.url;
+                return;
+            }
+            hidden.value = item.id;
+            input.value = item.label;
+            clear();
+        };
+
+        const render = results => {
+            clear();
+            results.forEach(item => {
+                const option = document.createElement('button');
+                option.type = 'button';
+                option.className = 'list-group-item list-group-item-action';
+                option.textContent = item.precinct ? `${item.label} - Precinct ${item.precinct}` : item.label;
+                option.addEventListener('click', () => choose(item));
+                list.appendChild(option);
+            });
+        };
+
+        const search = () => {
+            if (controller) {
+                controller.abort();
+            }
+            const query = input.value.trim();
+            if (query.length < MIN_CHARS) {
+                controller = null;
+                clear();
+                return;
+            }
+            controller = new AbortController();
+            fetch(`${url}?q=${encodeURIComponent(query)}`, {
+                signal: controller.signal,
+                credentials: 'same-origin',
+                headers: { 'Accept': 'application/json' }
+            })
+                .then(response => (response.ok ? response.json() : { results: [] }))
+                .then(data => render(data.results))
+                .catch(error => {
+                    if (error.name !== 'AbortError') {
+                        clear();
+                    }
+                });
+        };
+
+        input.addEventListener('input', () => {
+            if (hidden) {
+                hidden.value = '';
+            }
+            clearTimeout(timer);
+            timer = setTimeout(search, DEBOUNCE_MS);
+        });
+
+        input.addEventListener('keydown', event => {
+            if (event.key === 'Escape') {
+                clear();
+            } else if (event.key === 'ArrowDown' && list.firstChild) {
+                event.preventDefault();
+                list.firstChild.focus();
+            }
+        });
+
+        list.addEventListener('keydown', event => {
+            const current = document.activeElement;
+            if (event.key === 'ArrowDown' && current.nextSibling) {
+                event.preventDefault();
+                current.nextSibling.focus();
+            } else if (event.key === 'ArrowUp') {
+                event.preventDefault();
+                (current.previousSibling || input).focus();
+            } else if (event.key === 'Escape') {
+                clear();
+                input.focus();
+            }
+        });
+
+        document.addEventListener('click', event => {
+            if (!container.contains(event.target)) {
+                clear();
+            }
+        });
+    };
+
+    document.addEventListener('DOMContentLoaded', () => {
+        document.querySelectorAll('.citizen-autocomplete').forEach(attach);
+    });
+})();
@@ -3,11 +3,26 @@ Unit tests for Lezo LGU System core app.
 Covers all features and updated Citizen model.
 """
 
-from django.test import TestCase
-from .models import Citizen, Service, Transaction, Relationship, UserProfile, ServiceApplication
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from unittest import mock
+from .models import Citizen, Service, Transaction, Relationship, UserProfile, ServiceApplication, AssistanceLedger, OutboundMessage, RequestProfile
 from .utils import get_relationships
+from . import documents, ledger, routers
+from .notifications import FakeGateway, dispatch
+from .utils import send_sms
+from .voter_import import BARANGAY_SHEETS
+from .management.commands.benchmark_startup import measure_startup
 from django.contrib.auth.models import User
-from datetime import date
+from datetime import date, datetime, timezone as dt_timezone
+from io import StringIO
+import os
+import tempfile
+import pandas as pd
+from decimal import Decimal
+from django.utils import timezone
 
 class CoreTests(TestCase):
     def setUp(self):
@@ -68,3 +83,443 @@ class CoreTests(TestCase):
         app = ServiceApplication.objects.create(citizen=self.citizen1, service=self.service)
         self.assertEqual(app.status, 'pending')
         self.assertEqual(str(app), 'John Doe - AICS (pending)')
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.citizen = Citizen.objects.create(last_name='Doe', first_name='John', barangay='Poblacion')
+
+    def make_service(self, amount, status='Pending', assistance_type='Medical'):
+        return Service.objects.create(
+            citizen=self.citizen, barangay='Poblacion', assistance_type=assistance_type,
+            recipient_name='John Doe', amount=amount, status=status
+        )
+
+    def entry(self, assistance_type='Medical'):
+        return AssistanceLedger.objects.get(citizen=self.citizen, assistance_type=assistance_type)
+
+    def test_approval_updates_ledger(self):
+        service = self.make_service('1500.00')
+        self.assertFalse(AssistanceLedger.objects.exists())
+        service.status = 'Approved'
+        service.save()
+        self.make_service('500.00', status='Approved')
+        self.assertEqual(self.entry().approved_amount, Decimal('2000.00'))
+        self.assertEqual(self.entry().approved_count, 2)
+
+    def test_rejecting_approved_service_debits_ledger(self):
+        service = self.make_service('1500.00', status='Approved')
+        service.status = 'Rejected'
+        service.save()
+        self.assertEqual(self.entry().approved_amount, Decimal('0.00'))
+        self.assertEqual(self.entry().approved_count, 0)
+
+    def test_debit_beyond_row_rebuilds_it(self):
+        older = [self.make_service('1500.00', status='Approved') for _ in range(2)]
+        AssistanceLedger.objects.all().delete()
+        self.make_service('500.00', status='Approved')
+        with self.assertLogs('core', level='WARNING'):
+            for service in older:
+                service.status = 'Rejected'
+                service.save()
+        self.assertEqual(self.entry().approved_amount, Decimal('500.00'))
+        self.assertEqual(self.entry().approved_count, 1)
+
+    def test_transaction_updates_ledger(self):
+        service = self.make_service('1500.00', status='Approved')
+        Transaction.objects.create(citizen=self.citizen, service=service, amount='700.00')
+        self.assertEqual(self.entry().disbursed_amount, Decimal('700.00'))
+        self.assertEqual(self.entry().transaction_count, 1)
+
+    def test_reconcile_rebuilds_totals(self):
+        service = self.make_service('1500.00', status='Approved')
+        Transaction.objects.create(citizen=self.citizen, service=service, amount='700.00')
+        AssistanceLedger.objects.update(approved_amount=0, disbursed_amount=0)
+        self.assertEqual(ledger.reconcile(), 1)
+        self.assertEqual(self.entry().approved_amount, Decimal('1500.00'))
+        self.assertEqual(self.entry().disbursed_amount, Decimal('700.00'))
+
+    @override_settings(TIME_ZONE='Asia/Manila')
+    def test_ledger_year_follows_time_zone(self):
+        service = self.make_service('1500.00')
+        # 2024-12-31 17:00 UTC is already New Year's Day in Manila.
+        Service.objects.filter(pk=service.pk).update(created_at=datetime(2024, 12, 31, 17, tzinfo=dt_timezone.utc))
+        service.refresh_from_db()
+        service.status = 'Approved'
+        service.save()
+        self.assertEqual(self.entry().year, 2025)
+        ledger.reconcile()
+        self.assertEqual(self.entry().year, 2025)
+        service.status = 'Rejected'
+        service.save()
+        self.assertEqual(self.entry().approved_count, 0)
+
+    def test_deleting_citizen_cascades(self):
+        self.make_service('1500.00', status='Approved')
+        self.citizen.delete()
+        self.assertFalse(AssistanceLedger.objects.exists())
+
+    @override_settings(ASSISTANCE_ANNUAL_LIMITS={'Medical': 2000})
+    def test_eligibility_against_limit(self):
+        self.make_service('1500.00', status='Approved')
+        result = ledger.eligibility(self.entry(), 'Medical', Decimal('600.00'))
+        self.assertEqual(result['remaining'], Decimal('500.00'))
+        self.assertFalse(result['eligible'])
+        self.assertTrue(ledger.eligibility(None, 'Educational', Decimal('600.00'))['eligible'])
+
+    @override_settings(ASSISTANCE_ANNUAL_LIMITS={'Medical': 2000})
+    def test_approval_queue_shows_remaining_limit(self):
+        User.objects.create_superuser(username='admin', password='adminpass')
+        self.client.login(username='admin', password='adminpass')
+        self.make_service('1500.00', status='Approved')
+        pending = self.make_service('300.00')
+        response = self.client.get('/approve_applications/')
+        self.assertContains(response, '500.00 of 2000')
+        self.client.post('/approve_applications/', {'service_id': pending.id, 'status': 'Approved'})
+        self.assertEqual(self.entry().approved_amount, Decimal('1800.00'))
+
+class NotificationTests(TestCase):
+    def setUp(self):
+        self.citizen = Citizen.objects.create(last_name='Doe', first_name='John', barangay='Poblacion', mobile_no='09171234567')
+
+    def test_send_sms_queues_and_dedupes(self):
+        send_sms(self.citizen, 'Approved', dedupe_key='service-1-Approved')
+        send_sms(self.citizen, 'Approved', dedupe_key='service-1-Approved')
+        self.assertEqual(OutboundMessage.objects.count(), 1)
+        self.assertEqual(OutboundMessage.objects.get().recipient, '09171234567')
+
+    def test_no_mobile_number_queues_nothing(self):
+        citizen = Citizen.objects.create(last_name='Cruz', first_name='Ana', barangay='Ibao', philhealth_no='PH-2')
+        self.assertIsNone(send_sms(citizen, 'Approved'))
+        self.assertFalse(OutboundMessage.objects.exists())
+
+    def test_dispatch_sends_batch(self):
+        for i in range(5):
+            send_sms(self.citizen, f'Message {i}')
+        gateway = FakeGateway()
+        stats = dispatch(gateway=gateway, batch_size=3, concurrency=2)
+        self.assertEqual(stats['sent'], 3)
+        self.assertEqual(len(gateway.sent), 3)
+        dispatch(gateway=gateway, batch_size=3)
+        self.assertEqual(OutboundMessage.objects.filter(status='Sent').count(), 5)
+
+    def test_dispatch_retries_with_backoff(self):
+        send_sms(self.citizen, 'Hello')
+        stats = dispatch(gateway=FakeGateway(fail_times=1), backoff=60)
+        self.assertEqual(stats['retried'], 1)
+        message = OutboundMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), ('Pending', 1))
+        self.assertGreater(message.next_attempt_at, timezone.now())
+        self.assertEqual(dispatch(gateway=FakeGateway())['claimed'], 0)
+
+    def test_dispatch_marks_failed_after_max_attempts(self):
+        send_sms(self.citizen, 'Hello')
+        dispatch(gateway=FakeGateway(fail_times=1), max_attempts=1)
+        self.assertEqual(OutboundMessage.objects.get().status, 'Failed')
+
+    def test_approval_queues_sms(self):
+        User.objects.create_superuser(username='admin', password='adminpass')
+        self.client.login(username='admin', password='adminpass')
+        service = Service.objects.create(
+            citizen=self.citizen, barangay='Poblacion', assistance_type='Medical',
+            recipient_name='John Doe', amount='100.00'
+        )
+        self.client.post('/approve_applications/', {'service_id': service.id, 'status': 'Approved'})
+        self.assertEqual(OutboundMessage.objects.get().dedupe_key, f'service-{service.id}-Approved')
+
+class ImportVotersTests(TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'voters.xlsx')
+        with pd.ExcelWriter(self.path, engine='openpyxl') as writer:
+            for sheet_name in BARANGAY_SHEETS:
+                rows = [
+                    {'LAST NAME': 'Dela Cruz', 'FIRST NAME': 'Juan', 'PRECINCT': '0001A', 'BIRTHDAY': '1980-01-01'},
+                    {'LAST NAME': sheet_name, 'FIRST NAME': 'Maria', 'PRECINCT': '0002A', 'SEX': 'F'},
+                    {'LAST NAME': 'Bad', 'FIRST NAME': 'Row', 'PRECINCT': None, 'BIRTHDAY': 'not a date'},
+                ]
+                pd.DataFrame(rows).to_excel(writer, sheet_name=sheet_name, index=False)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def run_import(self, workers):
+        out = StringIO()
+        call_command('import_voters', self.path, workers=workers, stdout=out)
+        return out.getvalue()
+
+    def test_import_dedupes_across_sheets(self):
+        self.run_import(workers=1)
+        self.assertEqual(Citizen.objects.filter(last_name='Dela Cruz').count(), 1)
+        self.assertEqual(Citizen.objects.filter(first_name='Maria').count(), 12)
+        self.assertEqual(Citizen.objects.get(last_name='Dela Cruz').birthday, date(1980, 1, 1))
+
+    def test_parallel_import_matches_serial(self):
+        serial = self.run_import(workers=1)
+        serial_rows = sorted(Citizen.objects.values_list('last_name', 'first_name', 'barangay'))
+        Citizen.objects.all().delete()
+        parallel = self.run_import(workers=2)
+        self.assertEqual(serial, parallel)
+        self.assertEqual(serial_rows, sorted(Citizen.objects.values_list('last_name', 'first_name', 'barangay')))
+
+class ProfilerTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='adminpass')
+        self.citizen = Citizen.objects.create(last_name='Doe', first_name='John', barangay='Poblacion')
+
+    def test_unprofiled_request_stores_nothing(self):
+        self.client.login(username='admin', password='adminpass')
+        self.client.get(f'/citizen/{self.citizen.id}/')
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_superuser_can_request_profile(self):
+        self.client.login(username='admin', password='adminpass')
+        self.client.get(f'/citizen/{self.citizen.id}/?_profile=1')
+        profile = RequestProfile.objects.get()
+        self.assertEqual((profile.path, profile.trigger, profile.status_code), (f'/citizen/{self.citizen.id}/', 'requested', 200))
+        self.assertGreater(profile.query_count, 0)
+        self.assertTrue(any('citizen_detail' in row['function'] for row in profile.top_functions))
+        response = self.client.get(f'/admin/core/requestprofile/{profile.id}/change/')
+        self.assertContains(response, 'SQL timeline')
+        response = self.client.get(f'/admin/core/requestprofile/{profile.id}/collapsed/')
+        self.assertEqual(response['Content-Type'], 'text/plain')
+
+    async def test_profiles_views_under_asgi(self):
+        await self.async_client.alogin(username='admin', password='adminpass')
+        await self.async_client.get(f'/citizen/{self.citizen.id}/?_profile=1')
+        profile = await RequestProfile.objects.aget()
+        self.assertGreater(profile.query_count, 0)
+        self.assertTrue(any('citizen_detail' in row['function'] for row in profile.top_functions))
+        await profile.adelete()
+        await self.async_client.get('/citizens/lookup/?q=do&_profile=1')
+        self.assertGreater((await RequestProfile.objects.aget()).query_count, 0)
+
+    def test_header_is_ignored_for_regular_users(self):
+        User.objects.create_user(username='staff', password='staffpass')
+        self.client.login(username='staff', password='staffpass')
+        self.client.get('/citizens/', HTTP_X_PROFILE='1')
+        self.assertFalse(RequestProfile.objects.exists())
+
+    @override_settings(PROFILER_SAMPLE_RATE=1, PROFILER_KEEP=2)
+    def test_old_profiles_are_pruned(self):
+        for _ in range(4):
+            self.client.get('/login/')
+        self.assertEqual(RequestProfile.objects.count(), 2)
+
+    def test_collapsed_stacks_require_view_permission(self):
+        staff = User.objects.create_user(username='staff', password='staffpass', is_staff=True)
+        self.client.login(username='admin', password='adminpass')
+        self.client.get(f'/citizen/{self.citizen.id}/?_profile=1')
+        profile = RequestProfile.objects.get()
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(f'/admin/core/requestprofile/{profile.id}/collapsed/').status_code, 403)
+
+    @override_settings(PROFILER_SAMPLE_RATE=1)
+    def test_sampling_profiles_any_request(self):
+        self.client.get('/login/')
+        self.assertEqual(RequestProfile.objects.get().trigger, 'sampled')
+
+class StartupTests(TestCase):
+    def test_heavy_modules_are_not_imported_at_startup(self):
+        measurements = measure_startup(forbidden=['pandas', 'openpyxl', 'psutil'])
+        self.assertEqual(measurements['forbidden'], [])
+        self.assertGreater(measurements['import_ms'], 0)
+
+    def test_export_loads_openpyxl_lazily(self):
+        User.objects.create_user(username='staff', password='staffpass')
+        self.client.login(username='staff', password='staffpass')
+        Citizen.objects.create(last_name='Doe', first_name='John', barangay='Poblacion')
+        response = self.client.get('/export_citizens/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('citizens.xlsx', response['Content-Disposition'])
+
+class BarangayScopeTests(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='staff', password='staffpass')
+        self.client.login(username='staff', password='staffpass')
+        Citizen.objects.create(last_name='Doe', first_name='John', barangay='Poblacion')
+        Citizen.objects.create(last_name='Cruz', first_name='Ana', barangay='Mina')
+
+    def test_for_barangay(self):
+        self.assertEqual(Citizen.objects.for_barangay('Mina').get().last_name, 'Cruz')
+        self.assertEqual(Citizen.objects.for_barangay('').count(), 2)
+
+    def test_citizens_view_filters_by_barangay(self):
+        response = self.client.get('/citizens/', {'barangay': 'Mina'})
+        self.assertEqual([c.last_name for c in response.context['page_obj']], ['Cruz'])
+        response = self.client.get('/citizens/', {'barangay': 'Unknown'})
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        routers.reset_replica_health()
+        User.objects.create_superuser(username='admin', password='adminpass')
+        self.client.login(username='admin', password='adminpass')
+        self.citizen = Citizen.objects.create(last_name='Doe', first_name='John', barangay='Poblacion')
+
+    def aliases_for(self, method, url, data=None):
+        """Return the set of database aliases that queried core tables during a request."""
+        with CaptureQueriesContext(connections['default']) as primary, CaptureQueriesContext(connections['replica']) as replica:
+            getattr(self.client, method)(url, data or {})
+        used = set()
+        for alias, captured in (('default', primary), ('replica', replica)):
+            if any('"core_' in q['sql'] for q in captured.captured_queries):
+                used.add(alias)
+        return used
+
+    def test_read_only_views_use_replica(self):
+        for url in ['/citizens/', '/reports/', '/export_citizens/', '/admin/core/citizen/']:
+            # export_citizens writes an AuditLog, which pins later reads to primary
+            self.client.cookies.pop(routers.PIN_COOKIE, None)
+            self.assertIn('replica', self.aliases_for('get', url), url)
+
+    def test_other_views_use_primary(self):
+        self.assertEqual(self.aliases_for('get', f'/citizen/{self.citizen.id}/'), {'default'})
+
+    def test_reads_pinned_to_primary_after_write(self):
+        service = Service.objects.create(
+            citizen=self.citizen, barangay='Poblacion', assistance_type='Medical',
+            recipient_name='John Doe', amount='100.00'
+        )
+        self.aliases_for('post', '/approve_applications/', {'service_id': service.id, 'status': 'Approved'})
+        self.assertIn(routers.PIN_COOKIE, self.client.cookies)
+        self.assertEqual(self.aliases_for('get', '/citizens/'), {'default'})
+
+    def test_lookup_authenticates_against_primary(self):
+        original = routers.ReplicaRouter.db_for_read
+        decisions = []
+        def db_for_read(router, model, **hints):
+            decisions.append((model.__name__, original(router, model, **hints)))
+            return decisions[-1][1]
+        with mock.patch.object(routers.ReplicaRouter, 'db_for_read', autospec=True, side_effect=db_for_read):
+            self.client.get('/citizens/lookup/', {'q': 'do'})
+        self.assertIn(('Session', 'default'), decisions)
+        self.assertIn(('User', 'default'), decisions)
+        self.assertIn(('Citizen', 'replica'), decisions)
+
+    def test_falls_back_to_primary_when_replica_down(self):
+        with mock.patch.object(routers, 'check_replica', return_value=False):
+            self.assertEqual(self.aliases_for('get', '/citizens/'), {'default'})
+
+class DocumentTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.settings_override = override_settings(DOCUMENTS_ROOT=self.root)
+        self.settings_override.enable()
+        self.juan = Citizen.objects.create(last_name='Dela Cruz', first_name='Juan', barangay='Mina', precinct='0001A')
+        Citizen.objects.create(last_name='Santos', first_name='Ana', barangay='Mina', precinct='0002A')
+        Citizen.objects.create(last_name='Reyes', first_name='Jose', barangay='Ibao', precinct='0001A')
+
+    def tearDown(self):
+        self.settings_override.disable()
+
+    def test_generate_renders_each_precinct(self):
+        stats = documents.generate()
+        self.assertEqual((stats['rendered'], stats['unchanged']), (3, 0))
+        entry = documents.load_manifest()[documents.precinct_key('Mina', '0001A')]
+        with open(os.path.join(self.root, entry['files']['voter_list'])) as f:
+            self.assertIn('Dela Cruz', f.read())
+
+    def test_only_changed_precincts_regenerate(self):
+        documents.generate()
+        self.assertEqual(documents.generate()['rendered'], 0)
+        self.juan.address = 'Purok 2'
+        self.juan.save()
+        stats = documents.generate()
+        self.assertEqual((stats['rendered'], stats['unchanged']), (1, 2))
+        Citizen.objects.filter(barangay='Ibao').delete()
+        self.assertEqual(documents.generate()['removed'], 1)
+
+    def test_parallel_generation(self):
+        stats = documents.generate(workers=2)
+        self.assertEqual(stats['rendered'], 3)
+        # The caller's connection and transaction survive the pool.
+        self.assertEqual(Citizen.objects.count(), 3)
+
+    def test_document_views(self):
+        User.objects.create_superuser(username='admin', password='adminpass')
+        self.client.login(username='admin', password='adminpass')
+        documents.generate()
+        self.assertContains(self.client.get('/documents/'), '0002A')
+        response = self.client.get('/documents/file/', {'key': 'Mina|0002A', 'kind': 'claim_slips'})
+        self.assertIn(b'Santos', b''.join(response.streaming_content))
+        self.assertEqual(self.client.get('/documents/file/', {'key': 'Mina|9999', 'kind': 'claim_slips'}).status_code, 404)
+
+    def test_missing_precincts_share_one_group(self):
+        Citizen.objects.create(last_name='Aquino', first_name='Ben', barangay='Mina', precinct=None)
+        Citizen.objects.create(last_name='Bautista', first_name='Carla', barangay='Mina', precinct='')
+        documents.generate()
+        entry = documents.load_manifest()[documents.precinct_key('Mina', None)]
+        self.assertEqual(entry['count'], 2)
+        with open(os.path.join(self.root, entry['files']['claim_slips'])) as f:
+            html = f.read()
+        self.assertIn('Aquino', html)
+        self.assertIn('Bautista', html)
+
+    def test_similar_precincts_get_separate_files(self):
+        Citizen.objects.create(last_name='Lopez', first_name='Dan', barangay='Mina', precinct='0001-A')
+        documents.generate()
+        manifest = documents.load_manifest()
+        files = [manifest[documents.precinct_key('Mina', p)]['files']['voter_list'] for p in ('0001A', '0001-A')]
+        self.assertNotEqual(*files)
+        with open(os.path.join(self.root, files[1])) as f:
+            self.assertIn('Lopez', f.read())
+
+    def test_lock_blocks_overlapping_runs(self):
+        with documents.generation_lock():
+            self.assertTrue(documents.generation_running())
+            with self.assertRaises(documents.GenerationInProgress):
+                documents.generate()
+        self.assertFalse(documents.generation_running())
+        self.assertEqual(documents.generate()['rendered'], 3)
+
+    def test_running_check_does_not_take_the_lock(self):
+        with open(os.path.join(self.root, '.lock'), 'w') as f:
+            f.write('999999999')
+        self.assertFalse(documents.generation_running())
+        with documents.generation_lock():
+            with mock.patch('core.documents.fcntl.flock', side_effect=AssertionError('lock taken')):
+                self.assertTrue(documents.generation_running())
+
+    def test_view_reports_running_generation(self):
+        User.objects.create_superuser(username='admin', password='adminpass')
+        self.client.login(username='admin', password='adminpass')
+        with documents.generation_lock(), mock.patch('core.views.subprocess.Popen') as popen:
+            self.assertContains(self.client.get('/documents/'), 'Document generation is running')
+            self.client.post('/documents/', {'barangay': 'Mina'})
+        popen.assert_not_called()
+
+class CitizenLookupTests(TestCase):
+    def setUp(self):
+        User.objects.create_superuser(username='admin', password='adminpass')
+        Citizen.objects.create(last_name='Dela Cruz', first_name='Juan', barangay='Mina', precinct='0001A')
+        Citizen.objects.create(last_name='Delos Santos', first_name='Ana', barangay='Ibao')
+        Citizen.objects.create(last_name='Reyes', first_name='Juana', barangay='Mina')
+
+    def lookup(self, **params):
+        return self.client.get('/citizens/lookup/', params).json()
+
+    def test_requires_login(self):
+        self.assertEqual(self.client.get('/citizens/lookup/', {'q': 'de'}).status_code, 401)
+
+    def test_prefix_matches_first_or_last_name(self):
+        self.client.login(username='admin', password='adminpass')
+        self.assertEqual([r['label'] for r in self.lookup(q='del')['results']],
+                         ['Juan Dela Cruz (Mina)', 'Ana Delos Santos (Ibao)'])
+        self.assertEqual(len(self.lookup(q='juan')['results']), 2)
+        self.assertEqual(len(self.lookup(q='juan dela')['results']), 1)
+        self.assertEqual(len(self.lookup(q='de', limit='1')['results']), 1)
+        self.assertEqual(self.lookup(q='d')['results'], [])
+
+    def test_service_form_uses_autocomplete(self):
+        self.client.login(username='admin', password='adminpass')
+        response = self.client.get('/add_service/')
+        self.assertContains(response, 'citizen-autocomplete')
+        self.assertContains(response, 'core/autocomplete.js')
+        self.assertNotContains(response, 'Dela Cruz')
+        citizen = Citizen.objects.get(first_name='Ana')
+        self.client.post('/add_service/', {
+            'citizen': citizen.id, 'barangay': 'Ibao', 'assistance_type': 'Medical',
+            'recipient_name': 'Ana', 'amount': '100.00', 'status': 'Pending'
+        })
+        self.assertEqual(Service.objects.get().citizen, citizen)
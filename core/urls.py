@@ -7,6 +7,7 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
     path('import/', views.import_data, name='import_data'),
     path('citizens/', views.citizens, name='citizens'),
+    path('citizens/lookup/', views.citizen_lookup, name='citizen_lookup'),
     path('citizen/<int:citizen_id>/', views.citizen_detail, name='citizen_detail'),
     path('add_service/', views.add_service, name='add_service'),
     path('add_relationship/', views.add_relationship, name='add_relationship'),
@@ -17,4 +18,6 @@ urlpatterns = [
     path('citizen_dashboard/', views.citizen_dashboard, name='citizen_dashboard'),
     path('export_citizens/', views.export_citizens, name='export_citizens'),
     path('system_health/', views.system_health, name='system_health'),
+    path('documents/', views.document_list, name='document_list'),
+    path('documents/file/', views.document_file, name='document_file'),
 ]
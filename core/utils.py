@@ -1,9 +1,10 @@
 """
 Utility functions for Lezo LGU System.
-Includes genealogy inference and SMS placeholder.
+Includes genealogy inference and SMS notification.
 """
 
 from .models import Relationship
+from .notifications import enqueue_sms
 import logging
 
 logger = logging.getLogger('core')
@@ -33,10 +34,10 @@ def get_relationships(citizen):
 
     return inferred
 
-def send_sms(citizen, message):
+def send_sms(citizen, message, dedupe_key=None):
     """
-    Placeholder for SMS notification.
-    Requires an SMS gateway API (e.g., Twilio) for full implementation.
+    Queue an SMS notification for a citizen.
+    The message is written to the outbox and delivered by `manage.py dispatch_sms`,
+    so callers never wait on the SMS gateway.
     """
-    # Replace with actual SMS API call, e.g., using Twilio
-    logger.info(f"SMS to {citizen.philhealth_no or citizen.first_name}: {message}")
+    return enqueue_sms(citizen, message, dedupe_key=dedupe_key)
@@ -3,17 +3,31 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from django.core.paginator import Paginator
+from django.db import transaction
 from django.db.models import Count, Q
+from django import forms
 from django.forms import ModelForm
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils import timezone
 import logging
-import psutil
-import pandas as pd
-import openpyxl
+import os
+import subprocess
+import sys
 from .models import Citizen, Service, Relationship, AuditLog
+from . import documents, ledger
+from .utils import send_sms
+from .routers import replica_reads
+# voter_import, exports and health pull in pandas, openpyxl and psutil, which
+# are slow to import; the views that need them import them inside the function
+# so worker startup stays within STARTUP_BUDGET.
 
 logger = logging.getLogger('core')
 
+LOOKUP_LIMIT = 10
+LOOKUP_MAX = 25
+
 BARANGAYS = [
     "Agcawilan", "Bagto", "Bugasongan", "Carugdog", "Cogon", "Ibao", "Mina",
     "Poblacion", "Silakat Nonok", "Sta. Cruz", "Sta. Cruz Biga-a", "Tayhawan"
@@ -25,7 +39,7 @@ class CitizenForm(ModelForm):
         fields = [
             'no', 'last_name', 'first_name', 'middle_name', 'suffix', 'address',
             'precinct', 'legend', 'sex', 'birthday', 'place_of_birth',
-            'civil_status', 'tin', 'philhealth_no', 'barangay'
+            'civil_status', 'tin', 'philhealth_no', 'mobile_no', 'barangay'
         ]
 
     def clean_tin(self):
@@ -40,15 +54,31 @@ class CitizenForm(ModelForm):
             raise ValidationError("PhilHealth No must be unique")
         return philhealth_no
 
+class CitizenAutocomplete(forms.Widget):
+    """Type-ahead citizen picker backed by citizen_lookup instead of a <select> of every citizen."""
+    template_name = 'core/widgets/citizen_autocomplete.html'
+
+    class Media:
+        js = ('core/autocomplete.js',)
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        citizen = Citizen.objects.filter(pk=value).first() if str(value or '').isdigit() else None
+        context['widget']['label'] = str(citizen) if citizen else ''
+        context['widget']['lookup_url'] = reverse('citizen_lookup')
+        return context
+
 class ServiceForm(ModelForm):
     class Meta:
         model = Service
         fields = ['citizen', 'barangay', 'assistance_type', 'recipient_name', 'amount', 'status', 'remarks']
+        widgets = {'citizen': CitizenAutocomplete()}
 
 class RelationshipForm(ModelForm):
     class Meta:
         model = Relationship
         fields = ['from_citizen', 'to_citizen', 'relationship_type']
+        widgets = {'from_citizen': CitizenAutocomplete(), 'to_citizen': CitizenAutocomplete()}
 
 def admin_required(view_func):
     return user_passes_test(lambda u: u.is_superuser)(view_func)
@@ -87,31 +117,11 @@ def import_data(request):
             return render(request, 'core/import.html')
         
         try:
-            xl = pd.ExcelFile(excel_file)
+            from .voter_import import parse_upload
             citizens_to_create = []
-            for sheet_name in xl.sheet_names:
-                if sheet_name in BARANGAYS:
-                    df = pd.read_excel(excel_file, sheet_name=sheet_name)
-                    for index, row in df.iterrows():
-                        no = row.get('NO')
-                        if not pd.isna(no) and not Citizen.objects.filter(no=no, barangay=sheet_name).exists():
-                            citizens_to_create.append(Citizen(
-                                no=int(no) if not pd.isna(no) else None,
-                                last_name=row.get('LAST NAME', 'Unknown'),
-                                first_name=row.get('FIRST NAME', 'Unknown'),
-                                middle_name=row.get('MIDDLE NAME'),
-                                suffix=row.get('SUFFIX'),
-                                address=row.get('ADDRESS'),
-                                precinct=row.get('PRECINT'),
-                                legend=row.get('LEGEND'),
-                                sex=row.get('SEX'),
-                                birthday=row.get('BIRTHDAY'),
-                                place_of_birth=row.get('PLACE OF BIRTH'),
-                                civil_status=row.get('CIVIL STATUS'),
-                                tin=row.get('TIN'),
-                                philhealth_no=row.get('PHILHEALTH NO'),
-                                barangay=sheet_name
-                            ))
+            for sheet_name, no, fields in parse_upload(excel_file, BARANGAYS):
+                if not Citizen.objects.filter(no=no, barangay=sheet_name).exists():
+                    citizens_to_create.append(Citizen(no=no, barangay=sheet_name, **fields))
             if citizens_to_create:
                 Citizen.objects.bulk_create(citizens_to_create)
                 imported_count = len(citizens_to_create)
@@ -126,15 +136,57 @@ def import_data(request):
     return render(request, 'core/import.html')
 
 @login_required
+@replica_reads
 def citizens(request):
     query = request.GET.get('q', '')
-    citizens_list = Citizen.objects.filter(
+    barangay = request.GET.get('barangay', '')
+    if barangay not in BARANGAYS:
+        barangay = ''
+    citizens_list = Citizen.objects.for_barangay(barangay).filter(
         Q(last_name__icontains=query) | Q(first_name__icontains=query)
     ).order_by('last_name', 'first_name')
     paginator = Paginator(citizens_list, 10)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
-    return render(request, 'core/citizens.html', {'page_obj': page_obj, 'query': query})
+    return render(request, 'core/citizens.html', {
+        'page_obj': page_obj,
+        'query': query,
+        'barangay': barangay,
+        'barangays': BARANGAYS
+    })
+
+@replica_reads
+async def citizen_lookup(request):
+    """
+    Type-ahead search for the citizen picker and the citizens search box.
+    Async so a burst of keystroke requests doesn't tie up sync workers;
+    every name term must prefix-match the first or last name.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+    terms = request.GET.get('q', '').split()[:4]
+    if len(''.join(terms)) < 2:
+        return JsonResponse({'results': []})
+    try:
+        limit = max(1, min(int(request.GET.get('limit', LOOKUP_LIMIT)), LOOKUP_MAX))
+    except ValueError:
+        limit = LOOKUP_LIMIT
+    barangay = request.GET.get('barangay', '')
+    citizens = Citizen.objects.for_barangay(barangay if barangay in BARANGAYS else '')
+    for term in terms:
+        citizens = citizens.filter(Q(last_name__istartswith=term) | Q(first_name__istartswith=term))
+    citizens = citizens.order_by('last_name', 'first_name').values('id', 'last_name', 'first_name', 'barangay', 'precinct')[:limit]
+    results = [
+        {
+            'id': c['id'],
+            'label': f"{c['first_name']} {c['last_name']} ({c['barangay']})",
+            'precinct': c['precinct'],
+            'url': reverse('citizen_detail', args=[c['id']]),
+        }
+        async for c in citizens
+    ]
+    return JsonResponse({'results': results})
 
 @login_required
 def citizen_detail(request, citizen_id):
@@ -142,6 +194,11 @@ def citizen_detail(request, citizen_id):
     relationships_from = citizen.relationships_from.all()
     relationships_to = citizen.relationships_to.all()
     services = citizen.services.all()
+    year = timezone.localdate().year
+    assistance = [
+        dict(entry=entry, **ledger.eligibility(entry, entry.assistance_type))
+        for entry in citizen.assistance_ledger.filter(year=year).order_by('assistance_type')
+    ]
     if request.method == 'POST' and request.user.is_superuser:
         form = CitizenForm(request.POST, instance=citizen)
         if form.is_valid():
@@ -156,7 +213,9 @@ def citizen_detail(request, citizen_id):
         'form': form,
         'relationships_from': relationships_from,
         'relationships_to': relationships_to,
-        'services': services
+        'services': services,
+        'assistance': assistance,
+        'assistance_year': year
     })
 
 @admin_required
@@ -203,18 +262,32 @@ def apply_service(request):
 
 @admin_required
 def approve_applications(request):
-    services = Service.objects.filter(status='Pending')
     if request.method == 'POST':
         service_id = request.POST.get('service_id')
         status = request.POST.get('status')
-        service = get_object_or_404(Service, id=service_id)
-        service.status = status
-        service.save()
-        AuditLog.objects.create(user=request.user, action='UPDATE', model_name='Service', object_id=service.id, details=f"Status changed to {status}")
+        with transaction.atomic():
+            service = get_object_or_404(Service, id=service_id)
+            service.status = status
+            service.save()
+            AuditLog.objects.create(user=request.user, action='UPDATE', model_name='Service', object_id=service.id, details=f"Status changed to {status}")
+            send_sms(service.citizen, f"Your {service.assistance_type} assistance application has been {status.lower()}.", dedupe_key=f"service-{service.id}-{status}")
         messages.success(request, f"Service {service} status updated to {status}")
-    return render(request, 'core/approve_applications.html', {'services': services})
+    barangay = request.GET.get('barangay', '')
+    if barangay not in BARANGAYS:
+        barangay = ''
+    services = list(Service.objects.for_barangay(barangay).filter(status='Pending').select_related('citizen'))
+    entries = ledger.ledger_map([s.citizen_id for s in services], [ledger.ledger_year(s.created_at) for s in services])
+    for service in services:
+        entry = entries.get((service.citizen_id, service.assistance_type, ledger.ledger_year(service.created_at)))
+        service.eligibility = ledger.eligibility(entry, service.assistance_type, service.amount)
+    return render(request, 'core/approve_applications.html', {
+        'services': services,
+        'barangay': barangay,
+        'barangays': BARANGAYS
+    })
 
 @login_required
+@replica_reads
 def reports(request):
     citizens_by_barangay = Citizen.objects.values('barangay').annotate(count=Count('id'))
     services_by_type = Service.objects.values('assistance_type').annotate(count=Count('id'))
@@ -243,16 +316,10 @@ def citizen_dashboard(request):
     return render(request, 'core/citizen_dashboard.html', {'citizen': citizen, 'services': services})
 
 @login_required
+@replica_reads
 def export_citizens(request):
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Citizens"
-    ws.append(['NO', 'Last Name', 'First Name', 'Middle Name', 'Suffix', 'Address', 'Precinct', 'Sex', 'Birthday', 'Barangay'])
-    for citizen in Citizen.objects.all():
-        ws.append([
-            citizen.no, citizen.last_name, citizen.first_name, citizen.middle_name, citizen.suffix,
-            citizen.address, citizen.precinct, citizen.sex, citizen.birthday, citizen.barangay
-        ])
+    from .exports import citizens_workbook
+    wb = citizens_workbook(Citizen.objects.all())
     response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
     response['Content-Disposition'] = 'attachment; filename=citizens.xlsx'
     wb.save(response)
@@ -261,12 +328,39 @@ def export_citizens(request):
 
 @login_required
 def system_health(request):
-    cpu_usage = psutil.cpu_percent(interval=1)
-    memory = psutil.virtual_memory()
-    context = {
-        'cpu_usage': cpu_usage,
-        'memory_total': memory.total / (1024 * 1024),
-        'memory_used': memory.used / (1024 * 1024),
-        'memory_percent': memory.percent,
-    }
+    from .health import system_metrics
+    context = system_metrics()
     return render(request, 'core/system_health.html', context)
+
+@admin_required
+def document_list(request):
+    running = documents.generation_running()
+    if request.method == 'POST':
+        if running:
+            messages.info(request, "Document generation is already running; refresh this page to see new documents")
+            return redirect('document_list')
+        command = [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'generate_documents']
+        barangay = request.POST.get('barangay')
+        if barangay in BARANGAYS:
+            command += ['--barangay', barangay]
+        # Runs detached so the request returns immediately; generate() holds a lock against overlapping runs.
+        subprocess.Popen(command, cwd=settings.BASE_DIR, start_new_session=True,
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        AuditLog.objects.create(user=request.user, action='CREATE', model_name='Document', object_id=0, details=f"Started document generation for {barangay or 'all barangays'}")
+        messages.success(request, "Document generation started; refresh this page to see new documents")
+        return redirect('document_list')
+    entries = sorted(documents.load_manifest().items(), key=lambda item: (item[1]['barangay'], item[1]['precinct'] or ''))
+    return render(request, 'core/documents.html', {
+        'entries': entries,
+        'barangays': BARANGAYS,
+        'running': running
+    })
+
+@admin_required
+def document_file(request):
+    entry = documents.load_manifest().get(request.GET.get('key', ''))
+    relative = entry['files'].get(request.GET.get('kind', '')) if entry else None
+    path = os.path.join(documents.documents_root(), relative) if relative else None
+    if not path or not os.path.exists(path):
+        raise Http404("Document not found")
+    return FileResponse(open(path, 'rb'), content_type='text/html')
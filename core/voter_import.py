@@ -0,0 +1,108 @@
+"""
+Sheet parsing for the voters.xlsx import.
+Kept free of Django model imports so sheets can be parsed in worker processes;
+the import_voters command and import_data view handle duplicate checks and
+database writes.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import pandas as pd
+
+BARANGAY_SHEETS = [
+    'Agcawilan', 'Bagto', 'Bugasongan', 'Carugdog', 'Cogon', 'Ibao', 'Mina',
+    'Poblacion', 'Silakat Nonok', 'Sta. Cruz', 'Sta. Cruz Biga-a', 'Tayhawan'
+]
+
+def _text(row, column, lower=False):
+    if column not in row or not pd.notnull(row[column]):
+        return None
+    value = str(row[column]).strip()
+    return value.lower() if lower else value
+
+def parse_row(row):
+    """Normalize one sheet row into Citizen field values."""
+    birthday = None
+    if 'BIRTHDAY' in row and pd.notnull(row['BIRTHDAY']):
+        birthday = pd.to_datetime(row['BIRTHDAY'], errors='coerce')
+        birthday = None if pd.isna(birthday) else birthday.date()
+    return {
+        'last_name': str(row['LAST NAME']).strip(),
+        'first_name': str(row['FIRST NAME']).strip(),
+        'middle_name': _text(row, 'MIDDLE NAME'),
+        'suffix': _text(row, 'SUFFIX'),
+        'address': _text(row, 'ADDRESS'),
+        'precinct': str(row['PRECINCT']).strip(),
+        'legend': _text(row, 'LEGEND'),
+        'sex': _text(row, 'SEX') if 'SEX' in row and row['SEX'] in ['M', 'F'] else None,
+        'birthday': birthday,
+        'place_of_birth': _text(row, 'PLACE OF BIRTH'),
+        'civil_status': _text(row, 'CIVIL STATUS', lower=True),
+        'tin': _text(row, 'TIN'),
+        'philhealth_no': _text(row, 'PHILHEALTH NO'),
+        'mobile_no': _text(row, 'MOBILE NO'),
+        'status': _text(row, 'STATUS', lower=True) or 'active',
+    }
+
+def parse_sheet(excel_file, sheet_name):
+    """
+    Parse one barangay sheet.
+    Returns (sheet_name, rows, errors) where rows are (index, fields) tuples
+    and errors are (index, message) tuples, both in sheet order.
+    """
+    df = pd.read_excel(excel_file, sheet_name=sheet_name)
+    rows, errors = [], []
+    for index, row in df.iterrows():
+        try:
+            rows.append((index, parse_row(row)))
+        except Exception as e:
+            errors.append((index, str(e)))
+    return sheet_name, rows, errors
+
+def _parse_sheet_args(args):
+    return parse_sheet(*args)
+
+def parse_workbook(excel_file, sheet_names, workers=1):
+    """
+    Parse sheets serially or in a process pool of `workers` processes.
+    Results are yielded in the order of `sheet_names` regardless of which
+    worker finishes first, so error reporting stays deterministic. Workers are
+    spawned rather than forked so they never inherit the caller's DB connections.
+    """
+    tasks = [(excel_file, sheet_name) for sheet_name in sheet_names]
+    if workers <= 1:
+        yield from map(_parse_sheet_args, tasks)
+        return
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        yield from pool.map(_parse_sheet_args, tasks)
+
+def parse_upload(excel_file, barangays):
+    """
+    Parse a workbook uploaded through the import_data view.
+    Yields (sheet_name, no, fields) for each numbered row on a barangay sheet.
+    """
+    xl = pd.ExcelFile(excel_file)
+    for sheet_name in xl.sheet_names:
+        if sheet_name not in barangays:
+            continue
+        df = pd.read_excel(xl, sheet_name=sheet_name)
+        for index, row in df.iterrows():
+            no = row.get('NO')
+            if pd.isna(no):
+                continue
+            yield sheet_name, int(no), {
+                'last_name': row.get('LAST NAME', 'Unknown'),
+                'first_name': row.get('FIRST NAME', 'Unknown'),
+                'middle_name': row.get('MIDDLE NAME'),
+                'suffix': row.get('SUFFIX'),
+                'address': row.get('ADDRESS'),
+                'precinct': row.get('PRECINT'),
+                'legend': row.get('LEGEND'),
+                'sex': row.get('SEX'),
+                'birthday': row.get('BIRTHDAY'),
+                'place_of_birth': row.get('PLACE OF BIRTH'),
+                'civil_status': row.get('CIVIL STATUS'),
+                'tin': row.get('TIN'),
+                'philhealth_no': row.get('PHILHEALTH NO'),
+                'mobile_no': row.get('MOBILE NO'),
+            }
@@ -61,11 +61,18 @@ echo "Running database migrations..."
 python manage.py makemigrations
 python manage.py migrate
 
+# Fill the assistance ledger from existing services and transactions
+echo "Reconciling assistance ledger..."
+python manage.py reconcile_ledger
+
 # Create startup script
 echo "Creating start.sh..."
 cat > start.sh << EOL
 #!/bin/bash
 source venv/bin/activate
+# Deliver queued SMS notifications alongside the web server
+python manage.py dispatch_sms --loop &
+trap "kill \$!" EXIT
 gunicorn -b 0.0.0.0:8000 --workers 1 lezo_lgu.wsgi
 EOL
 chmod +x start.sh
@@ -0,0 +1,21 @@
+"""
+ASGI config for Lezo LGU System project.
+
+This module contains the ASGI application used by Gunicorn's Uvicorn worker (or Uvicorn
+directly) to serve the Django project, so async views such as the citizen type-ahead
+lookup run on the event loop instead of occupying a sync worker per request.
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+For more information on ASGI, see:
+- https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
+- https://asgi.readthedocs.io/
+"""
+
+import os
+from django.core.asgi import get_asgi_application
+
+# Set the default Django settings module for the 'lezo_lgu' project
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lezo_lgu.settings')
+
+# Create the ASGI application callable
+application = get_asgi_application()
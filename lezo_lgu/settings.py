@@ -2,6 +2,7 @@
 Django settings for Lezo LGU System project.
 """
 
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -27,6 +28,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.profiling.ProfilerMiddleware',
+    'core.routers.PrimaryPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -50,6 +53,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'lezo_lgu.wsgi.application'
+ASGI_APPLICATION = 'lezo_lgu.asgi.application'
 
 DATABASES = {
     'default': {
@@ -62,6 +66,20 @@ DATABASES = {
     }
 }
 
+# Read replica for reports, exports, search and admin changelists (see core.routers).
+# Without DB_REPLICA_* variables it points at the primary, so any second database
+# (or the primary itself) can stand in locally. Tests mirror it onto default.
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'NAME': os.environ.get('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+    'HOST': os.environ.get('DB_REPLICA_HOST', DATABASES['default']['HOST']),
+    'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+    'TEST': {'MIRROR': 'default'},
+}
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = 5  # reads stay on primary this long after a user writes
+REPLICA_MAX_LAG_SECONDS = 10
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -78,4 +96,29 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Cached per-precinct voter lists and claim slips (see core.documents)
+DOCUMENTS_ROOT = BASE_DIR / 'documents'
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Annual assistance caps per citizen, checked against the assistance ledger
+ASSISTANCE_ANNUAL_LIMITS = {
+    'Medical': 10000,
+    'Burial': 15000,
+}
+
+# SMS gateway used by `manage.py dispatch_sms` (see core.notifications)
+SMS_GATEWAY = 'core.notifications.LogGateway'
+
+# Request profiling (see core.profiling): superusers add ?_profile=1 or an
+# X-Profile header; PROFILER_SAMPLE_RATE = N also profiles 1 in N requests (0 = off)
+PROFILER_SAMPLE_RATE = 0
+# Only the newest PROFILER_KEEP profiles are kept; older ones are pruned as new ones are stored (0 = keep all)
+PROFILER_KEEP = 500
+
+# Checked by `manage.py benchmark_startup`; heavy I/O libraries must stay lazily imported
+STARTUP_BUDGET = {
+    'import_ms': 1000,
+    'rss_mb': 80,
+    'forbidden_modules': ['pandas', 'openpyxl', 'psutil'],
+}
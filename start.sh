@@ -1,4 +1,7 @@
 #!/bin/bash
 # Startup script for Lezo LGU System
 source venv/bin/activate
+# Deliver queued SMS notifications alongside the web server
+python manage.py dispatch_sms --loop &
+trap "kill $!" EXIT
 gunicorn -b 0.0.0.0:8000 --workers 1 lezo_lgu.wsgi